@@ -59,19 +59,10 @@
         rec {
           default = rico-hdl;
 
-          # Wrapping idea from:
-          # https://discourse.nixos.org/t/adding-non-python-dependencies-to-poetry2nix-application/26755/6
           rico-hdl = mkPoetryApplication {
             projectDir = ./.;
             preferWheels = true;
-            nativeBuildInputs = [ pkgs.makeBinaryWrapper ];
-            # maybe it is possible to rename the wrapper so that the
-            # wrapped binary doesn't have an ugly name?
-            propogatedBuildInputs = [ pkgs.fd ];
-            postInstall = ''
-              wrapProgram "$out/bin/rico-hdl" \
-                --prefix PATH : ${pkgs.lib.makeBinPath [ pkgs.fd ]}
-            '';
+            extras = [ "compression" "zstd" ];
             meta.mainProgram = "rico-hdl";
             # The SSL4EO-S12 base folder is copied instead of the individual base directories
             # as otherwise the directory would be prefixed with the hash of the directory
@@ -7,12 +7,37 @@
 import lmdb
 import rasterio
 import numpy as np
-from safetensors.numpy import load
+from safetensors.numpy import load, save
 import os
 from pathlib import Path
 import pytest
 import subprocess
 import hashlib
+import queue
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from rico_hdl.reader import (
+    BAND_ORDERINGS,
+    LMDBDataset,
+    LMDBReader,
+    parse_safetensors_header,
+)
+from rico_hdl.rico_hdl import (
+    CompactSchemaError,
+    band_statistics,
+    ordered_results,
+    compact_record,
+    encode_record,
+    fast_find,
+    lmdb_commit_loop,
+    read_file_index,
+    shutdown_worker_pool,
+    worker_pool,
+    write_file_index_entry,
+)
+from rico_hdl.tiff import read_simple_tiff
+import json
+import shutil
 
 
 def read_single_band_raster(path):
@@ -809,3 +834,802 @@ def test_eurosat_integration(eurosat_ms_root, encoded_eurosat_ms_path):
 
     assert all(arr.shape == (64, 64) for arr in sample_safetensors_dict.values())
     assert all(arr.dtype == "uint16" for arr in sample_safetensors_dict.values())
+
+
+def test_resume_interrupted_conversion(hydro_root, encoded_hydro_path, tmp_path):
+    # the shared fixture remains a clean reference for the other tests
+    target_dir = tmp_path.joinpath("hydro_lmdb")
+    shutil.copytree(encoded_hydro_path, target_dir)
+    env = lmdb.open(str(target_dir), readonly=False, map_size=1024**3)
+    with env.begin(write=False) as txn:
+        reference_data = dict(txn.cursor())
+
+    # simulate an interrupted run by removing the last committed patches
+    with env.begin(write=True) as txn:
+        assert txn.delete(b"patch_10000")
+        assert txn.delete(b"patch_100000")
+    env.close()
+
+    # without `--resume` the converter refuses to overwrite the existing keys
+    assert (
+        subprocess.run(
+            [
+                "rico-hdl",
+                "hydro",
+                f"--dataset-dir={hydro_root}",
+                f"--target-dir={target_dir}",
+            ],
+        ).returncode
+        != 0
+    )
+
+    subprocess.run(
+        [
+            "rico-hdl",
+            "hydro",
+            f"--dataset-dir={hydro_root}",
+            f"--target-dir={target_dir}",
+            "--resume",
+        ],
+        check=True,
+    )
+
+    env = lmdb.open(str(target_dir), readonly=True)
+    with env.begin(write=False) as txn:
+        resumed_data = dict(txn.cursor())
+    assert resumed_data == reference_data
+
+    journal = json.loads(target_dir.joinpath("rico-hdl-journal.json").read_text())
+    assert journal["hydro_to_safetensor"]["status"] == "complete"
+    assert journal["hydro_to_safetensor"]["num_committed"] == len(reference_data)
+
+
+def test_commit_thresholds(hydro_root, encoded_hydro_path, tmpdir_factory):
+    target_dir = Path(tmpdir_factory.mktemp("hydro_commit_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "hydro",
+            f"--dataset-dir={hydro_root}",
+            f"--target-dir={target_dir}",
+            "--commit-records=1",
+            "--commit-bytes=1024",
+        ],
+        check=True,
+    )
+    reader = LMDBReader(target_dir)
+    full_reader = LMDBReader(encoded_hydro_path)
+    assert reader.keys() == full_reader.keys()
+    for sample, full_sample in zip(
+        reader.get_many(reader.keys()), full_reader.get_many(full_reader.keys())
+    ):
+        assert all(np.array_equal(sample[b], full_sample[b]) for b in full_sample)
+
+
+def test_update_only_encodes_changed_patches(hydro_root, tmpdir_factory):
+    source_dir = Path(tmpdir_factory.mktemp("hydro_source")).joinpath("Hydro")
+    shutil.copytree(hydro_root, source_dir)
+    target_dir = Path(tmpdir_factory.mktemp("hydro_update_lmdb"))
+    cmd = [
+        "rico-hdl",
+        "hydro",
+        f"--dataset-dir={source_dir}",
+        f"--target-dir={target_dir}",
+        "--update",
+    ]
+    subprocess.run(cmd, check=True)
+
+    env = lmdb.open(str(target_dir), readonly=True, max_dbs=1)
+    with env.begin(write=False) as txn:
+        initial_data = {
+            k: v for k, v in txn.cursor() if not k.startswith(b"__rico_hdl_")
+        }
+    env.close()
+    assert len(initial_data) == 7
+
+    # remove one patch and replace another one with different data
+    source_dir.joinpath("patch_10.tif").unlink()
+    shutil.copy(source_dir.joinpath("patch_0.tif"), source_dir.joinpath("patch_1.tif"))
+    subprocess.run(cmd, check=True)
+
+    env = lmdb.open(str(target_dir), readonly=True, max_dbs=1)
+    with env.begin(write=False) as txn:
+        updated_data = {
+            k: v for k, v in txn.cursor() if not k.startswith(b"__rico_hdl_")
+        }
+        fingerprint_db = env.open_db(b"__rico_hdl_fingerprints__", txn=txn)
+        fingerprint_keys = set(txn.cursor(db=fingerprint_db).iternext(values=False))
+
+    assert updated_data.keys() == initial_data.keys() - {b"patch_10"}
+    assert fingerprint_keys == updated_data.keys()
+    assert updated_data[b"patch_1"] == initial_data[b"patch_0"]
+    assert updated_data[b"patch_100"] == initial_data[b"patch_100"]
+
+
+def test_reader(encoded_bigearthnet_s1_s2_reference_maps_path):
+    s2_key = "S2A_MSIL2A_20170613T101031_N9999_R022_T33UUP_75_43"
+    s1_key = "S1A_IW_GRDH_1SDV_20170613T165043_33UUP_70_48"
+    env = lmdb.open(str(encoded_bigearthnet_s1_s2_reference_maps_path), readonly=True)
+    with env.begin(write=False) as txn:
+        s1_data = load(txn.get(s1_key.encode()))
+        s2_data = load(txn.get(s2_key.encode()))
+    env.close()
+
+    reader = LMDBReader(encoded_bigearthnet_s1_s2_reference_maps_path)
+    assert reader.keys() == sorted(reader.keys())
+    assert len(reader.keys()) == 3
+
+    rgb = reader.get(s2_key, bands=["B04", "B03", "B02"])
+    assert rgb.shape == (3, 120, 120)
+    assert rgb.dtype == "uint16"
+    assert np.array_equal(rgb, np.stack([s2_data[b] for b in ["B04", "B03", "B02"]]))
+
+    decoded_s1 = reader.get(s1_key)
+    assert decoded_s1.keys() == s1_data.keys()
+    assert all(np.array_equal(decoded_s1[k], s1_data[k]) for k in s1_data)
+
+    with pytest.raises(ValueError):
+        reader.get(s2_key, bands=["B02", "B01"])
+
+    dataset = LMDBDataset(
+        encoded_bigearthnet_s1_s2_reference_maps_path,
+        bands=BAND_ORDERINGS["bigearthnet-s1"],
+        keys=[s1_key],
+    )
+    assert len(dataset) == 1
+    s1_stacked = dataset[0]
+    assert s1_stacked.shape == (2, 120, 120)
+    assert np.array_equal(s1_stacked[0], s1_data["VH"])
+    assert all(
+        np.array_equal(a, s1_stacked)
+        for a in reader.get_many([s1_key, s1_key], bands=["VH", "VV"])
+    )
+
+
+def test_reader_get_many_keeps_order(encoded_hydro_path):
+    reader = LMDBReader(encoded_hydro_path, bands=["B04", "B03", "B02"])
+    keys = ["patch_100000", "patch_0", "patch_1000", "patch_0", "patch_10"]
+    batch = reader.get_many(keys)
+    assert len(batch) == len(keys)
+    for key, arr in zip(keys, batch):
+        assert np.array_equal(arr, reader.get(key))
+    assert np.array_equal(batch[1], batch[3])
+    assert not np.array_equal(batch[0], batch[1])
+
+    with pytest.raises(KeyError):
+        reader.get_many(["patch_0", "patch_2"])
+
+
+def test_reader_band_views(encoded_hyspecnet_path):
+    key = "ENMAP01-____L2A-DT0000004950_20221103T162438Z_001_V010110_20221118T145147Z-Y01460273_X03110438"
+    reader = LMDBReader(encoded_hyspecnet_path)
+    full = reader.get(key)
+    selected_bands = ["B1", "B50", "B224"]
+    with reader.views([key], bands=selected_bands) as batch:
+        (sample,) = batch
+        assert list(sample.keys()) == selected_bands
+        assert all(not arr.flags.writeable for arr in sample.values())
+        assert all(np.array_equal(sample[b], full[b]) for b in selected_bands)
+
+
+def test_band_selection(
+    hyspecnet_root, encoded_hyspecnet_path, bigearthnet_s2_root, tmpdir_factory
+):
+    target_dir = Path(tmpdir_factory.mktemp("hyspecnet_bands_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "hyspecnet-11k",
+            f"--dataset-dir={hyspecnet_root}",
+            f"--target-dir={target_dir}",
+            "--bands=B50,B3",
+            "--bands=B224",
+        ],
+        check=True,
+    )
+    full_reader = LMDBReader(encoded_hyspecnet_path)
+    reader = LMDBReader(target_dir)
+    assert reader.keys() == full_reader.keys()
+    for key in reader.keys():
+        sample = reader.get(key)
+        assert list(sample.keys()) == ["B50", "B3", "B224"]
+        assert np.array_equal(
+            reader.get(key, bands=["B50", "B3", "B224"]),
+            full_reader.get(key, bands=["B50", "B3", "B224"]),
+        )
+
+    # VV does not belong to BigEarthNet-S2 and no S1 directory is given
+    result = subprocess.run(
+        [
+            "rico-hdl",
+            "bigearthnet",
+            f"--bigearthnet-s2-dir={bigearthnet_s2_root}",
+            f"--target-dir={tmpdir_factory.mktemp('bigearthnet_bands_lmdb')}",
+            "--bands=VV",
+        ],
+    )
+    assert result.returncode != 0
+
+
+def test_band_selection_skips_sensors(
+    bigearthnet_s1_root,
+    bigearthnet_s2_root,
+    encoded_bigearthnet_s1_s2_path,
+    tmpdir_factory,
+):
+    target_dir = Path(tmpdir_factory.mktemp("bigearthnet_s1_bands_lmdb"))
+    # VV only belongs to BigEarthNet-S1, so BigEarthNet-S2 is skipped
+    subprocess.run(
+        [
+            "rico-hdl",
+            "bigearthnet",
+            f"--bigearthnet-s1-dir={bigearthnet_s1_root}",
+            f"--bigearthnet-s2-dir={bigearthnet_s2_root}",
+            f"--target-dir={target_dir}",
+            "--bands=VV",
+        ],
+        check=True,
+    )
+    full_reader = LMDBReader(encoded_bigearthnet_s1_s2_path)
+    s1_keys = [k for k in full_reader.keys() if k.startswith("S1")]
+    reader = LMDBReader(target_dir)
+    assert reader.keys() == s1_keys
+    for key in s1_keys:
+        assert np.array_equal(reader.get(key)["VV"], full_reader.get(key)["VV"])
+
+
+def test_compression(
+    bigearthnet_s2_root, encoded_bigearthnet_s1_s2_path, tmpdir_factory
+):
+    target_dir = Path(tmpdir_factory.mktemp("bigearthnet_compressed_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "bigearthnet",
+            f"--bigearthnet-s2-dir={bigearthnet_s2_root}",
+            f"--target-dir={target_dir}",
+            "--compression=zstd:bytedelta:5",
+        ],
+        check=True,
+    )
+    key = "S2A_MSIL2A_20170613T101031_N9999_R022_T33UUP_75_43"
+    reader = LMDBReader(target_dir)
+    full_reader = LMDBReader(encoded_bigearthnet_s1_s2_path)
+    compressed = reader.get(key)
+    uncompressed = full_reader.get(key)
+    assert compressed.keys() == uncompressed.keys()
+    assert all(compressed[b].dtype == uncompressed[b].dtype for b in uncompressed)
+    assert all(np.array_equal(compressed[b], uncompressed[b]) for b in uncompressed)
+    assert np.array_equal(
+        reader.get(key, bands=["B04", "B03", "B02"]),
+        full_reader.get(key, bands=["B04", "B03", "B02"]),
+    )
+
+    with reader.env.begin(write=False) as txn:
+        compressed_size = len(txn.get(key.encode()))
+    with full_reader.env.begin(write=False) as txn:
+        uncompressed_size = len(txn.get(key.encode()))
+    assert compressed_size < uncompressed_size
+
+
+def test_zstd_dictionary_compression(
+    uc_merced_root, encoded_uc_merced_path, tmpdir_factory
+):
+    target_dir = Path(tmpdir_factory.mktemp("uc_merced_zstd_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "uc-merced",
+            f"--dataset-dir={uc_merced_root}",
+            f"--target-dir={target_dir}",
+            "--zstd-dictionary-samples=4",
+        ],
+        check=True,
+    )
+    reader = LMDBReader(target_dir)
+    full_reader = LMDBReader(encoded_uc_merced_path)
+    assert reader.keys() == full_reader.keys()
+    with reader.env.begin(write=False) as txn:
+        dictionary_keys = [
+            k
+            for k in txn.cursor().iternext(values=False)
+            if k.startswith(b"__rico_hdl_zstd_dictionary_")
+        ]
+    assert len(dictionary_keys) == 1
+
+    batch = reader.get_many(reader.keys())
+    full_batch = full_reader.get_many(full_reader.keys())
+    for sample, full_sample in zip(batch, full_batch):
+        assert sample.keys() == full_sample.keys()
+        assert all(np.array_equal(sample[b], full_sample[b]) for b in full_sample)
+
+
+def test_sharded_conversion(hydro_root, encoded_hydro_path, tmpdir_factory):
+    target_dir = Path(tmpdir_factory.mktemp("hydro_sharded_lmdb"))
+    cmd = [
+        "rico-hdl",
+        "hydro",
+        f"--dataset-dir={hydro_root}",
+        f"--target-dir={target_dir}",
+        "--num-shards=3",
+    ]
+    subprocess.run(cmd + ["--update"], check=True)
+    manifest = json.loads(target_dir.joinpath("rico-hdl-shards.json").read_text())
+    assert manifest["num_shards"] == 3
+    assert all(
+        target_dir.joinpath(shard, "data.mdb").exists() for shard in manifest["shards"]
+    )
+
+    reader = LMDBReader(target_dir)
+    full_reader = LMDBReader(encoded_hydro_path)
+    keys = full_reader.keys()
+    assert reader.keys() == keys
+    shard_keys = [LMDBReader(target_dir / s).keys() for s in manifest["shards"]]
+    assert sum(len(k) for k in shard_keys) == len(keys)
+    bands = ["B04", "B03", "B02"]
+    for sharded, full in zip(
+        reader.get_many(keys[::-1], bands=bands),
+        full_reader.get_many(keys[::-1], bands=bands),
+    ):
+        assert np.array_equal(sharded, full)
+    with reader.views(keys, bands=bands) as batch:
+        assert len(batch) == len(keys)
+
+    # unchanged update run and a mismatching number of shards
+    subprocess.run(cmd + ["--update"], check=True)
+    assert reader.keys() == keys
+    result = subprocess.run(cmd[:-1] + ["--num-shards=2"])
+    assert result.returncode != 0
+
+
+@pytest.mark.parametrize(
+    "options",
+    [[], ["--compact", "--zstd-dictionary-samples=4"]],
+    ids=["default", "compact-zstd"],
+)
+def test_distributed_parts_merge(
+    hydro_root, encoded_hydro_path, tmpdir_factory, options
+):
+    num_parts = 3
+    part_dirs = [
+        Path(tmpdir_factory.mktemp(f"hydro_part_{i}_lmdb")) for i in range(num_parts)
+    ]
+    # simulate the nodes with one process per part
+    processes = [
+        subprocess.Popen(
+            [
+                "rico-hdl",
+                "hydro",
+                f"--dataset-dir={hydro_root}",
+                f"--target-dir={part_dir}",
+                f"--part={i}/{num_parts}",
+                *options,
+            ]
+        )
+        for i, part_dir in enumerate(part_dirs)
+    ]
+    assert all(p.wait() == 0 for p in processes)
+    part_keys = [LMDBReader(part_dir).keys() for part_dir in part_dirs]
+    assert sum(len(k) for k in part_keys) == 7
+
+    # all parts are required
+    target_dir = Path(tmpdir_factory.mktemp("hydro_merged_lmdb"))
+    result = subprocess.run(
+        ["rico-hdl", "merge", f"--target-dir={target_dir}", *map(str, part_dirs[1:])]
+    )
+    assert result.returncode != 0
+
+    subprocess.run(
+        [
+            "rico-hdl",
+            "merge",
+            f"--target-dir={target_dir}",
+            *map(str, reversed(part_dirs)),
+        ],
+        check=True,
+    )
+    reference_dir = encoded_hydro_path
+    if options:
+        reference_dir = Path(tmpdir_factory.mktemp("hydro_single_node_lmdb"))
+        subprocess.run(
+            [
+                "rico-hdl",
+                "hydro",
+                f"--dataset-dir={hydro_root}",
+                f"--target-dir={reference_dir}",
+                *options,
+            ],
+            check=True,
+        )
+    with target_dir.joinpath("data.mdb").open(mode="rb") as f:
+        merged_hash = hashlib.file_digest(f, "sha256").hexdigest()
+    with reference_dir.joinpath("data.mdb").open(mode="rb") as f:
+        reference_hash = hashlib.file_digest(f, "sha256").hexdigest()
+    assert merged_hash == reference_hash
+
+
+def test_ordered_results_discards_pending_results():
+    started = []
+    discarded = []
+
+    def encode(item):
+        started.append(item)
+        return item
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = ordered_results(
+            pool, encode, range(100), max_in_flight=8, discard=discarded.append
+        )
+        yielded = [item for _, (item, _) in zip(range(3), results)]
+        results.close()
+    assert yielded == [0, 1, 2]
+    # every started task is either consumed or discarded
+    assert sorted(started) == [0, 1, 2, *sorted(discarded)]
+
+
+def test_fast_find(ssl4eo_s12_s1_root, uc_merced_root, tmpdir_factory):
+    assert sorted(fast_find(".", ssl4eo_s12_s1_root, exact_depth=2)) == sorted(
+        os.path.abspath(p) for p in ssl4eo_s12_s1_root.glob("*/*") if p.is_dir()
+    )
+    # smart case like `fd`: lowercase patterns are case-insensitive
+    assert len(fast_find(r"\d\d\.TIF$", uc_merced_root, only_dir=False)) == 0
+    assert len(fast_find(r"\d\d\.tif$", uc_merced_root, only_dir=False)) == 4
+
+    # hidden entries are skipped
+    root = Path(tmpdir_factory.mktemp("fast_find"))
+    root.joinpath(".hidden", "patch_1").mkdir(parents=True)
+    root.joinpath("visible", "patch_2").mkdir(parents=True)
+    root.joinpath("visible", "patch_3.tif").touch()
+    assert fast_find(r"patch_\d+$", root) == [str(root.joinpath("visible", "patch_2"))]
+
+
+def test_fast_find_file_index(tmpdir_factory):
+    root = Path(tmpdir_factory.mktemp("file_index_source"))
+    index_dir = Path(tmpdir_factory.mktemp("file_index_lmdb"))
+    for name in ["a", "b"]:
+        root.joinpath(name, f"patch_{name}").mkdir(parents=True)
+    paths = sorted(fast_find(r"patch_\w$", root, index_dir=index_dir))
+    assert len(paths) == 2
+    assert index_dir.joinpath("rico-hdl-file-index.json.gz").exists()
+    assert sorted(fast_find(r"patch_\w$", root, index_dir=index_dir)) == paths
+
+    # a new entry changes the modification time of its parent directory
+    root.joinpath("b", "patch_c").mkdir()
+    assert len(fast_find(r"patch_\w$", root, index_dir=index_dir)) == 3
+    # the index is keyed by the regular expression
+    assert len(fast_find(r"patch_[ab]$", root, index_dir=index_dir)) == 2
+
+
+def test_no_file_index(hydro_root, encoded_hydro_path, tmpdir_factory):
+    target_dir = Path(tmpdir_factory.mktemp("hydro_no_file_index_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "hydro",
+            f"--dataset-dir={hydro_root}",
+            f"--target-dir={target_dir}",
+            "--no-file-index",
+        ],
+        check=True,
+    )
+    assert not target_dir.joinpath("rico-hdl-file-index.json.gz").exists()
+    assert LMDBReader(target_dir).keys() == LMDBReader(encoded_hydro_path).keys()
+
+
+def test_file_index_concurrent_updates(tmpdir_factory):
+    index_dir = Path(tmpdir_factory.mktemp("file_index_concurrent"))
+    keys = [f"sub_dataset_{i}" for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(
+            pool.map(
+                lambda key: write_file_index_entry(
+                    index_dir, key, {"paths": [key], "dirs": {}}
+                ),
+                keys,
+            )
+        )
+    assert sorted(read_file_index(index_dir)) == keys
+    assert [p.name for p in index_dir.iterdir()] == ["rico-hdl-file-index.json.gz"]
+
+
+def test_shared_worker_pool_dictionaries(
+    ssl4eo_s12_s1_root,
+    ssl4eo_s12_s2_l1c_root,
+    ssl4eo_s12_s2_l2a_root,
+    encoded_ssl4eo_s12_path,
+    tmpdir_factory,
+):
+    target_dir = Path(tmpdir_factory.mktemp("ssl4eo_s12_zstd_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "ssl4eo-s12",
+            f"--s1-dir={ssl4eo_s12_s1_root}",
+            f"--s2-l1c-dir={ssl4eo_s12_s2_l1c_root}",
+            f"--s2-l2a-dir={ssl4eo_s12_s2_l2a_root}",
+            f"--target-dir={target_dir}",
+            "--zstd-dictionary-samples=2",
+        ],
+        check=True,
+    )
+    reader = LMDBReader(target_dir)
+    full_reader = LMDBReader(encoded_ssl4eo_s12_path)
+    # every sub-dataset trains its own dictionary in the shared worker pool
+    with reader.env.begin(write=False) as txn:
+        dictionary_keys = [
+            k
+            for k in txn.cursor().iternext(values=False)
+            if k.startswith(b"__rico_hdl_zstd_dictionary_")
+        ]
+    assert len(dictionary_keys) == 3
+
+    keys = full_reader.keys()
+    assert reader.keys() == keys
+    for sample, full_sample in zip(reader.get_many(keys), full_reader.get_many(keys)):
+        assert sample.keys() == full_sample.keys()
+        assert all(np.array_equal(sample[b], full_sample[b]) for b in full_sample)
+
+
+def test_worker_pool_is_shared():
+    executor = worker_pool(1)
+    assert worker_pool(1) is executor
+    # the worker process is started and initialized once and reused for all tasks
+    assert len({executor.submit(os.getpid).result() for _ in range(4)}) == 1
+    # a different number of workers replaces the shared pool
+    assert worker_pool(2) is not executor
+    shutdown_worker_pool()
+
+
+def test_gdal_config_override(hyspecnet_root, encoded_hyspecnet_path, tmpdir_factory):
+    target_dir = Path(tmpdir_factory.mktemp("hyspecnet_gdal_config_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "hyspecnet-11k",
+            f"--dataset-dir={hyspecnet_root}",
+            f"--target-dir={target_dir}",
+            "--gdal-config=GDAL_CACHEMAX=8",
+            "--gdal-config=GDAL_NUM_THREADS=1",
+        ],
+        check=True,
+    )
+    # the GDAL configuration does not change the encoded data
+    with target_dir.joinpath("data.mdb").open(mode="rb") as f:
+        encoded_hash = hashlib.file_digest(f, "sha256").hexdigest()
+    with encoded_hyspecnet_path.joinpath("data.mdb").open(mode="rb") as f:
+        reference_hash = hashlib.file_digest(f, "sha256").hexdigest()
+    assert encoded_hash == reference_hash
+
+    result = subprocess.run(
+        [
+            "rico-hdl",
+            "hyspecnet-11k",
+            f"--dataset-dir={hyspecnet_root}",
+            f"--target-dir={tmpdir_factory.mktemp('invalid_gdal_config')}",
+            "--gdal-config=GDAL_CACHEMAX",
+        ],
+    )
+    assert result.returncode != 0
+
+
+def test_read_simple_tiff(bigearthnet_s1_root, bigearthnet_s2_root, ssl4eo_s12_s1_root):
+    paths = [
+        *bigearthnet_s1_root.rglob("*.tif"),
+        *bigearthnet_s2_root.rglob("*.tif"),
+        *ssl4eo_s12_s1_root.rglob("*.tif"),
+    ]
+    assert len(paths) > 0
+    for path in paths:
+        data = read_simple_tiff(path)
+        with rasterio.open(path) as r:
+            expected = r.read(1)
+            is_simple = r.profile.get("compress") is None and r.count == 1
+        if not is_simple:
+            assert data is None
+            continue
+        assert data is not None
+        assert data.dtype == expected.dtype
+        assert data.shape == expected.shape
+        assert data.tobytes() == expected.tobytes()
+
+
+def test_stacked_layout(
+    bigearthnet_s2_root, encoded_bigearthnet_s1_s2_path, tmpdir_factory
+):
+    target_dir = Path(tmpdir_factory.mktemp("bigearthnet_stacked_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "bigearthnet",
+            f"--bigearthnet-s2-dir={bigearthnet_s2_root}",
+            f"--target-dir={target_dir}",
+            "--layout=stacked",
+        ],
+        check=True,
+    )
+    key = "S2A_MSIL2A_20170613T101031_N9999_R022_T33UUP_75_43"
+    reader = LMDBReader(target_dir)
+    full_reader = LMDBReader(encoded_bigearthnet_s1_s2_path)
+    with reader.env.begin(write=False) as txn:
+        stacked = load(txn.get(key.encode()))
+    # one tensor per resolution group in the default band ordering
+    assert {name: arr.shape for name, arr in stacked.items()} == {
+        "120x120": (4, 120, 120),
+        "60x60": (6, 60, 60),
+        "20x20": (2, 20, 20),
+    }
+
+    sample = reader.get(key)
+    full_sample = full_reader.get(key)
+    assert list(sample.keys()) == BAND_ORDERINGS["bigearthnet-s2"]
+    assert all(np.array_equal(sample[b], full_sample[b]) for b in full_sample)
+    assert np.array_equal(
+        reader.get(key, bands=["B04", "B03", "B02"]),
+        full_reader.get(key, bands=["B04", "B03", "B02"]),
+    )
+
+
+def test_resample_sentinel_2(
+    bigearthnet_s2_root, encoded_bigearthnet_s1_s2_path, tmpdir_factory
+):
+    target_dir = Path(tmpdir_factory.mktemp("bigearthnet_resampled_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "bigearthnet",
+            f"--bigearthnet-s2-dir={bigearthnet_s2_root}",
+            f"--target-dir={target_dir}",
+            "--resample=10:nearest",
+        ],
+        check=True,
+    )
+    key = "S2A_MSIL2A_20170613T101031_N9999_R022_T33UUP_75_43"
+    reader = LMDBReader(target_dir)
+    full_reader = LMDBReader(encoded_bigearthnet_s1_s2_path)
+    sample = reader.get(key)
+    full_sample = full_reader.get(key)
+    assert all(sample[b].shape == (120, 120) for b in full_sample)
+    # the 10m bands keep their original values
+    assert all(
+        np.array_equal(sample[b], full_sample[b]) for b in ["B02", "B03", "B04", "B08"]
+    )
+    # nearest neighbour upsampling repeats every 20m pixel twice along each axis
+    assert np.array_equal(sample["B05"][::2, ::2], full_sample["B05"])
+    with reader.env.begin(write=False) as txn:
+        header, metadata, _ = parse_safetensors_header(txn.get(key.encode()))
+    assert json.loads(metadata["resampling"]) == {
+        "resolution": 10.0,
+        "method": "nearest",
+    }
+
+
+def test_band_statistics(hydro_root, encoded_hydro_path, tmpdir_factory):
+    target_dir = Path(tmpdir_factory.mktemp("hydro_statistics_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "hydro",
+            f"--dataset-dir={hydro_root}",
+            f"--target-dir={target_dir}",
+            "--statistics",
+        ],
+        check=True,
+    )
+    statistics = LMDBReader(target_dir).statistics()["hydro"]
+    full_reader = LMDBReader(encoded_hydro_path)
+    samples = full_reader.get_many(full_reader.keys())
+    for band in BAND_ORDERINGS["hydro"]:
+        values = np.concatenate([sample[band].ravel() for sample in samples])
+        band_statistics = statistics[band]
+        assert band_statistics["count"] == values.size
+        assert np.isclose(band_statistics["mean"], values.mean(dtype=np.float64))
+        assert np.isclose(band_statistics["std"], values.std(dtype=np.float64))
+        assert band_statistics["min"] == values.min()
+        assert band_statistics["max"] == values.max()
+        assert sum(band_statistics["histogram"]["counts"]) == values.size
+
+
+def test_band_statistics_64_bit_histograms():
+    int64 = np.iinfo(np.int64)
+    statistics = band_statistics(
+        save(
+            {
+                "signed": np.array([int64.min, -1, 0, int64.max], np.int64),
+                "unsigned": np.array([0, 2**63, 2**64 - 1], np.uint64),
+            }
+        )
+    )
+    bins, counts = statistics["signed"]["histogram"]
+    assert bins.tolist() == [0, 511, 512, 1023]
+    assert counts.tolist() == [1, 1, 1, 1]
+    bins, counts = statistics["unsigned"]["histogram"]
+    assert bins.tolist() == [0, 512, 1023]
+
+
+def test_key_index(encoded_bigearthnet_s1_s2_path):
+    reader = LMDBReader(encoded_bigearthnet_s1_s2_path)
+    index = reader.key_index()
+    assert index is not None
+    with reader.env.begin(write=False) as txn:
+        records = {
+            k: len(v)
+            for k, v in txn.cursor().iternext()
+            if not k.startswith(b"__rico_hdl_")
+        }
+    assert index["keys"].tolist() == list(records)
+    assert index["sizes"].tolist() == list(records.values())
+    assert reader.keys() == [k.decode() for k in records]
+
+    datasets = {d["name"]: d["bands"] for d in index["datasets"]}
+    assert set(datasets["bigearthnet-s2"]) == set(BAND_ORDERINGS["bigearthnet-s2"])
+    assert datasets["bigearthnet-s2"]["B02"] == {
+        "dtype": "uint16",
+        "shape": [120, 120],
+    }
+    assert datasets["bigearthnet-s1"]["VV"]["dtype"] == "float32"
+
+
+def test_compact_records(hydro_root, encoded_hydro_path, tmpdir_factory):
+    target_dir = Path(tmpdir_factory.mktemp("hydro_compact_lmdb"))
+    subprocess.run(
+        [
+            "rico-hdl",
+            "hydro",
+            f"--dataset-dir={hydro_root}",
+            f"--target-dir={target_dir}",
+            "--compact",
+        ],
+        check=True,
+    )
+    reader = LMDBReader(target_dir)
+    full_reader = LMDBReader(encoded_hydro_path)
+    keys = full_reader.keys()
+    assert reader.keys() == keys
+    with reader.env.begin(write=False) as txn:
+        schema_keys = [
+            k
+            for k in txn.cursor().iternext(values=False)
+            if k.startswith(b"__rico_hdl_schema_")
+        ]
+    assert len(schema_keys) == 1
+
+    batch = reader.get_many(keys)
+    full_batch = full_reader.get_many(keys)
+    for key, sample, full_sample in zip(keys, batch, full_batch):
+        assert sample.keys() == full_sample.keys()
+        assert all(np.array_equal(sample[b], full_sample[b]) for b in full_sample)
+        # the original safetensors record is restored byte by byte
+        with full_reader.env.begin(write=False) as txn:
+            full_value = txn.get(key.encode())
+        with reader.env.begin(write=False) as txn:
+            assert len(txn.get(key.encode())) < len(full_value)
+        assert reader.safetensors(key) == full_value
+        assert load(reader.safetensors(key)).keys() == full_sample.keys()
+
+
+def test_commit_loop_records_write_errors(tmpdir_factory):
+    env = lmdb.open(str(tmpdir_factory.mktemp("map_full_lmdb")), map_size=256 * 1024)
+    result_queue = queue.Queue()
+    for i in range(16):
+        result_queue.put((f"patch_{i:02}".encode(), bytes(64 * 1024)))
+    result_queue.put(None)
+    failures = []
+    # returns instead of dying with the first error and drains the queue
+    lmdb_commit_loop(env, result_queue, bytes, 1, 1, failures)
+    assert len(failures) == 1
+    assert "MapFullError" in failures[0]
+    assert result_queue.empty()
+
+
+def test_compact_record_schema_mismatch():
+    def generator(path):
+        return save({"B01": np.zeros((2, 2) if path == "a" else (3, 3), np.uint16)})
+
+    schema_length = int.from_bytes(generator("a")[:8], "little")
+    schema = generator("a")[8 : 8 + schema_length]
+    encoders = [partial(compact_record, schema)]
+    record, _ = encode_record(generator, encoders, 2**30, False, "a")
+    assert len(record) < len(generator("a"))
+    with pytest.raises(CompactSchemaError) as e:
+        encode_record(generator, encoders, 2**30, False, "b")
+    assert e.value.args == ("b",)
@@ -0,0 +1,146 @@
+"""
+Constants that are shared between the converter and the reader.
+This module intentionally has no dependencies, so that it can be imported
+without installing the converter dependencies (rasterio, GDAL, ...).
+"""
+
+BIGEARTHNET_S2_ORDERING = [
+    "B02",
+    "B03",
+    "B04",
+    "B08",
+    "B05",
+    "B06",
+    "B07",
+    "B8A",
+    "B11",
+    "B12",
+    "B01",
+    "B09",
+]
+
+SSL4EO_S12_S1_ORDERING = ["VH", "VV"]
+SSL4EO_S12_S2_L1C_ORDERING = [
+    "B2",
+    "B3",
+    "B4",
+    "B8",
+    "B5",
+    "B6",
+    "B7",
+    "B8A",
+    "B10",
+    "B11",
+    "B12",
+    "B1",
+    "B9",
+]
+
+SSL4EO_S12_S2_L2A_ORDERING = [
+    "B2",
+    "B3",
+    "B4",
+    "B8",
+    "B5",
+    "B6",
+    "B7",
+    "B8A",
+    "B11",
+    "B12",
+    "B1",
+    "B9",
+]
+
+# Defined in the order of the bands!
+# Order taken from (and only implicitely confirmed in):
+# https://github.com/phelber/EuroSAT/issues/7#issuecomment-916754970
+# Visualizing the individual bands supports the ordering, as one
+# can see the different interpolation strengths for the 20 and 60m
+# bands.
+# This should be index band mapping and the ordering within the saftensor
+# can then be independent
+EUROSAT_MS_BANDS = [
+    "B01",
+    "B02",
+    "B03",
+    "B04",
+    "B05",
+    "B06",
+    "B07",
+    "B08",
+    "B09",
+    "B10",
+    "B11",
+    "B12",
+    "B08A",
+]
+
+BIGEARTHNET_S1_ORDERING = ["VH", "VV"]
+
+# Same as BigEarthNet ordering
+# for whatever reason decided to use lower case here
+MAJOR_TOM_S1_ORDERING = ["vh", "vv"]
+
+MAJOR_TOM_S2_ORDERING = [
+    "B02",
+    "B03",
+    "B04",
+    "B08",
+    "B05",
+    "B06",
+    "B07",
+    "B8A",
+    "B11",
+    "B12",
+    "B01",
+    "B09",
+]
+
+NUM_HYSPECNET_BANDS = 224
+NUM_SPECTRAL_EARTH_BANDS = 202
+HYSPECNET_BANDS = [f"B{i}" for i in range(1, NUM_HYSPECNET_BANDS + 1)]
+SPECTRAL_EARTH_BANDS = [f"B{i}" for i in range(1, NUM_SPECTRAL_EARTH_BANDS + 1)]
+# recommendation from HySpecNet-11k paper to skip the water vapour absorption bands
+HYSPECNET_WATER_VAPOUR_BANDS = [f"B{i}" for i in [*range(126, 141), *range(160, 167)]]
+HYSPECNET_RECOMMENDED_BANDS = [
+    b for b in HYSPECNET_BANDS if b not in HYSPECNET_WATER_VAPOUR_BANDS
+]
+# see output of `gdalinfo`
+UC_MERCED_BAND_IDX_COLOR_MAPPING = {1: "Red", 2: "Green", 3: "Blue"}
+
+HYDRO_BAND_IDX_BAND_MAPPING = {
+    1: "B01",
+    2: "B02",
+    3: "B03",
+    4: "B04",
+    5: "B05",
+    6: "B06",
+    7: "B07",
+    8: "B08",
+    9: "B8A",
+    10: "B09",
+    11: "B11",
+    12: "B12",
+}
+
+# All keys/databases that are used by rico-hdl itself start with this prefix
+# and should be skipped when iterating over the encoded patches.
+RESERVED_KEY_PREFIX = b"__rico_hdl_"
+
+# Trained zstd dictionaries are stored under this prefix followed by the dictionary id
+ZSTD_DICTIONARY_KEY_PREFIX = RESERVED_KEY_PREFIX + b"zstd_dictionary_"
+
+# The per-band statistics of each sub-dataset are stored under this prefix
+# followed by the name of the sub-dataset
+STATISTICS_KEY_PREFIX = RESERVED_KEY_PREFIX + b"statistics_"
+
+# The shared safetensors header of the compact records of a sub-dataset is stored
+# under this prefix followed by the schema id
+COMPACT_SCHEMA_KEY_PREFIX = RESERVED_KEY_PREFIX + b"schema_"
+
+# Manifest of a sharded conversion that is written next to the shard directories
+SHARDS_MANIFEST_FILE_NAME = "rico-hdl-shards.json"
+
+# Index of the sorted keys and record sizes that is written next to the LMDB files
+# at the end of a conversion, so that readers do not have to iterate over all keys
+KEY_INDEX_FILE_NAME = "rico-hdl-index.npz"
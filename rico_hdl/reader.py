@@ -0,0 +1,608 @@
+"""
+A framework-independent reader for the LMDB databases that are created by `rico-hdl`.
+
+The reader only depends on `lmdb` and `numpy` and parses the safetensors
+records directly, so that the requested bands are copied exactly once from
+the LMDB memory map into the resulting array.
+Compressed records additionally require the optional `compression` or `zstd` extras.
+"""
+
+import heapq
+import json
+import os
+import struct
+import zlib
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Optional, Sequence, TypeAlias, Union
+
+import lmdb
+import numpy as np
+
+try:
+    import blosc2
+except ImportError:
+    blosc2 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from rico_hdl.constants import (
+    COMPACT_SCHEMA_KEY_PREFIX,
+    BIGEARTHNET_S1_ORDERING,
+    BIGEARTHNET_S2_ORDERING,
+    EUROSAT_MS_BANDS,
+    HYDRO_BAND_IDX_BAND_MAPPING,
+    HYSPECNET_BANDS,
+    KEY_INDEX_FILE_NAME,
+    MAJOR_TOM_S1_ORDERING,
+    MAJOR_TOM_S2_ORDERING,
+    RESERVED_KEY_PREFIX,
+    SHARDS_MANIFEST_FILE_NAME,
+    SPECTRAL_EARTH_BANDS,
+    STATISTICS_KEY_PREFIX,
+    SSL4EO_S12_S1_ORDERING,
+    SSL4EO_S12_S2_L1C_ORDERING,
+    SSL4EO_S12_S2_L2A_ORDERING,
+    UC_MERCED_BAND_IDX_COLOR_MAPPING,
+    ZSTD_DICTIONARY_KEY_PREFIX,
+)
+
+# The band ordering of the safetensor entries for each (sub-)dataset.
+BAND_ORDERINGS = {
+    "bigearthnet-s1": BIGEARTHNET_S1_ORDERING,
+    "bigearthnet-s2": BIGEARTHNET_S2_ORDERING,
+    "bigearthnet-reference-maps": ["Data"],
+    "major-tom-core-s1": MAJOR_TOM_S1_ORDERING,
+    "major-tom-core-s2": MAJOR_TOM_S2_ORDERING,
+    "ssl4eo-s12-s1": SSL4EO_S12_S1_ORDERING,
+    "ssl4eo-s12-s2-l1c": SSL4EO_S12_S2_L1C_ORDERING,
+    "ssl4eo-s12-s2-l2a": SSL4EO_S12_S2_L2A_ORDERING,
+    "hyspecnet-11k": HYSPECNET_BANDS,
+    "spectral-earth-enmap": SPECTRAL_EARTH_BANDS,
+    "eurosat-multi-spectral": EUROSAT_MS_BANDS,
+    "hydro": list(HYDRO_BAND_IDX_BAND_MAPPING.values()),
+    "uc-merced": list(UC_MERCED_BAND_IDX_COLOR_MAPPING.values()),
+}
+
+# https://huggingface.co/docs/safetensors/index#format
+SAFETENSORS_DTYPES = {
+    "BOOL": np.bool_,
+    "U8": np.uint8,
+    "I8": np.int8,
+    "U16": np.uint16,
+    "I16": np.int16,
+    "F16": np.float16,
+    "U32": np.uint32,
+    "I32": np.int32,
+    "F32": np.float32,
+    "U64": np.uint64,
+    "I64": np.int64,
+    "F64": np.float64,
+}
+
+Key: TypeAlias = Union[str, bytes]
+
+# Records that were compressed with a trained zstd dictionary are stored as zstd frames.
+# A safetensors record cannot start with these bytes, as it would imply a header
+# of more than 4 GB.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Compact records start with this magic followed by the 4-byte schema id and the
+# band data. Like the zstd magic, it would imply a safetensors header of more than 4 GB.
+COMPACT_MAGIC = b"\xffRICOHDL"
+COMPACT_DATA_OFFSET = len(COMPACT_MAGIC) + 4
+
+# LMDB environments can only be opened once per process,
+# so all readers of the same process share the environment.
+_ENVIRONMENTS: dict[tuple[int, Path], lmdb.Environment] = {}
+# The zstd dictionaries are loaded once per process and database.
+_ZSTD_DICTIONARIES: dict[tuple[int, Path, int], "zstandard.ZstdCompressionDict"] = {}
+# The schemas of the compact records are loaded and parsed once per process and database.
+_COMPACT_SCHEMAS: dict[tuple[int, Path, int], tuple[bytes, tuple[dict, dict, int]]] = {}
+
+
+def encode_key(key: Key) -> bytes:
+    """
+    Encode a `str` key as LMDB key. `bytes` are returned unchanged.
+    """
+    return key.encode() if isinstance(key, str) else key
+
+
+def open_readonly_env(path: Union[str, Path]) -> lmdb.Environment:
+    """
+    Open the LMDB database at `path` with settings that are optimized for
+    random reads and return the environment.
+    The environment is only opened once per process and is re-opened
+    after forking.
+    """
+    cache_key = (os.getpid(), Path(path).resolve())
+    if cache_key not in _ENVIRONMENTS:
+        _ENVIRONMENTS[cache_key] = lmdb.open(
+            str(path),
+            readonly=True,
+            lock=False,
+            readahead=False,
+            meminit=False,
+            max_dbs=1,
+        )
+    return _ENVIRONMENTS[cache_key]
+
+
+def shard_index(key: bytes, num_shards: int) -> int:
+    """
+    Return the shard of the LMDB `key` for a conversion with `num_shards` shards.
+    The routing only depends on the key itself and is stable across
+    processes and Python versions.
+    """
+    return zlib.crc32(key) % num_shards
+
+
+def read_shards_manifest(path: Union[str, Path]) -> Optional[dict]:
+    """
+    Return the shards manifest of the conversion at `path` or `None`
+    if the conversion is not sharded.
+    """
+    manifest_path = Path(path).joinpath(SHARDS_MANIFEST_FILE_NAME)
+    if not manifest_path.exists():
+        return None
+    return json.loads(manifest_path.read_text())
+
+
+def read_key_index(path: Union[str, Path]) -> Optional[dict]:
+    """
+    Return the key index of the conversion at `path` or `None` if it does not exist.
+    The index contains the sorted `keys`, the `sizes` of their records in bytes,
+    and the `dataset_ids` of the keys, which refer to the list of `datasets`
+    with the name and the bands (data type and shape) of every sub-dataset.
+    """
+    index_path = Path(path).joinpath(KEY_INDEX_FILE_NAME)
+    if not index_path.exists():
+        return None
+    with np.load(index_path, allow_pickle=False) as index:
+        return {
+            "keys": index["keys"],
+            "sizes": index["sizes"],
+            "dataset_ids": index["dataset_ids"],
+            "datasets": json.loads(str(index["datasets"])),
+        }
+
+
+def compact_schema_key(schema_id: int) -> bytes:
+    """
+    Return the reserved LMDB key of the compact record schema with the given `schema_id`.
+    """
+    return COMPACT_SCHEMA_KEY_PREFIX + f"{schema_id}__".encode()
+
+
+def zstd_dictionary_key(dict_id: int) -> bytes:
+    """
+    Return the reserved LMDB key of the trained zstd dictionary with the given `dict_id`.
+    """
+    return ZSTD_DICTIONARY_KEY_PREFIX + f"{dict_id}__".encode()
+
+
+def parse_safetensors_header(buffer) -> tuple[dict, dict, int]:
+    """
+    Parse the JSON header of a serialized safetensors `buffer`.
+    Returns the header without the `__metadata__` entry, the metadata, and the
+    offset at which the tensor data starts.
+    If the band order was selected during encoding, the header entries
+    are returned in that order.
+    The tensor data itself is not accessed.
+    """
+    (header_size,) = struct.unpack_from("<Q", buffer, 0)
+    return parse_header(bytes(buffer[8 : 8 + header_size]), 8 + header_size)
+
+
+def parse_header(header_json: bytes, data_offset: int) -> tuple[dict, dict, int]:
+    """
+    Parse the safetensors JSON header `header_json` of a record whose tensor data
+    starts at `data_offset` (see `parse_safetensors_header`).
+    """
+    header = json.loads(header_json)
+    metadata = header.pop("__metadata__", None) or {}
+    if "bands" in metadata:
+        header = {band: header[band] for band in metadata["bands"].split(",")}
+    return header, metadata, data_offset
+
+
+def restore_safetensors(buffer, schema: bytes) -> bytes:
+    """
+    Restore the standard serialized safetensors record of the compact record in
+    `buffer` with the shared safetensors header `schema`.
+    Other records are returned unchanged.
+    """
+    if bytes(buffer[: len(COMPACT_MAGIC)]) != COMPACT_MAGIC:
+        return bytes(buffer)
+    return struct.pack("<Q", len(schema)) + schema + bytes(buffer[COMPACT_DATA_OFFSET:])
+
+
+def tensor_view(buffer, entry: dict, data_offset: int) -> np.ndarray:
+    """
+    Return a zero-copy `np.ndarray` view of the tensor that is described by
+    the safetensors header `entry` inside of the `buffer`.
+    """
+    start, end = entry["data_offsets"]
+    dtype = np.dtype(SAFETENSORS_DTYPES[entry["dtype"]])
+    return np.frombuffer(
+        buffer,
+        dtype=dtype,
+        count=(end - start) // dtype.itemsize,
+        offset=data_offset + start,
+    ).reshape(entry["shape"])
+
+
+def decompress_band(payload: np.ndarray, band_info: dict) -> np.ndarray:
+    """
+    Decompress the compressed `payload` of a single band into a newly
+    allocated array with the original `dtype` and `shape` from `band_info`.
+    """
+    if blosc2 is None:
+        raise ImportError(
+            'Reading compressed records requires the optional `compression` extra: pip install "rico-hdl[compression]"'
+        )
+    out = np.empty(band_info["shape"], dtype=SAFETENSORS_DTYPES[band_info["dtype"]])
+    blosc2.decompress2(payload, dst=out)
+    return out
+
+
+def band_views(
+    buffer,
+    bands: Optional[Sequence[str]] = None,
+    header: Optional[tuple[dict, dict, int]] = None,
+) -> dict[str, np.ndarray]:
+    """
+    Return zero-copy views of the selected `bands` (all bands if `None`) of the
+    serialized safetensors record in `buffer`.
+    Only the JSON header is parsed and the data of the other bands is never accessed.
+    Compact records require the already parsed `header` of their schema instead.
+    The views are only valid as long as the `buffer` is valid.
+
+    If the record is compressed, the selected bands are decompressed into
+    newly allocated arrays instead.
+    Records with the stacked layout return views of the rows of the stacked tensors.
+    """
+    header, metadata, data_offset = header or parse_safetensors_header(buffer)
+    band_infos = (
+        json.loads(metadata["compression"])["bands"]
+        if "compression" in metadata
+        else None
+    )
+
+    def tensor(name: str) -> np.ndarray:
+        view = tensor_view(buffer, header[name], data_offset)
+        if band_infos is None:
+            return view
+        return decompress_band(view, band_infos[name])
+
+    if "stacks" not in metadata:
+        bands = bands if bands is not None else header.keys()
+        return {band: tensor(band) for band in bands}
+
+    # records with the stacked layout store the bands as rows of `(C, H, W)` tensors
+    locations = {
+        band: (name, i)
+        for name, stack in json.loads(metadata["stacks"]).items()
+        for i, band in enumerate(stack)
+    }
+    bands = bands if bands is not None else locations.keys()
+    stacks = {}
+    views = {}
+    for band in bands:
+        name, i = locations[band]
+        if name not in stacks:
+            stacks[name] = tensor(name)
+        views[band] = stacks[name][i]
+    return views
+
+
+def decode_bands(
+    buffer,
+    bands: Optional[Sequence[str]] = None,
+    header: Optional[tuple[dict, dict, int]] = None,
+):
+    """
+    Decode the serialized safetensors record in `buffer`.
+    The `header` of compact records is forwarded to `band_views`.
+
+    If `bands` is given, the selected bands are copied into a single
+    newly allocated `(len(bands), H, W)` array in the given order.
+    All selected bands must have the same shape and data type.
+    Otherwise, a dictionary with a copy of every band is returned.
+    """
+    views = band_views(buffer, bands, header)
+    if bands is None:
+        return {name: view.copy() for name, view in views.items()}
+
+    shapes = {view.shape for view in views.values()}
+    dtypes = {view.dtype for view in views.values()}
+    if len(shapes) != 1 or len(dtypes) != 1:
+        raise ValueError(
+            f"Can only stack bands with identical shapes and dtypes, got: {shapes} and {dtypes}"
+        )
+    out = np.empty((len(views), *shapes.pop()), dtype=dtypes.pop())
+    for i, view in enumerate(views.values()):
+        out[i] = view
+    return out
+
+
+class LMDBReader:
+    """
+    Read patches from an LMDB database that was created by `rico-hdl`.
+
+    The LMDB environment is opened lazily and re-opened in each process
+    (for example, in each `DataLoader` worker), as LMDB environments must
+    not be shared across processes.
+    Within a process, all readers of the same database share the environment.
+
+    If `bands` is given, the selected bands are returned as a single stacked
+    `(len(bands), H, W)` array. Otherwise a dictionary with all bands is returned.
+
+    Sharded conversions are detected via their manifest and every lookup is
+    routed to the shard of the key.
+    """
+
+    def __init__(self, path: Union[str, Path], bands: Optional[Sequence[str]] = None):
+        self.path = Path(path)
+        self.bands = list(bands) if bands is not None else None
+        manifest = read_shards_manifest(self.path)
+        self.shard_paths = (
+            [self.path.joinpath(shard) for shard in manifest["shards"]]
+            if manifest is not None
+            else [self.path]
+        )
+
+    @property
+    def envs(self) -> list[lmdb.Environment]:
+        return [open_readonly_env(shard_path) for shard_path in self.shard_paths]
+
+    @property
+    def env(self) -> lmdb.Environment:
+        """
+        The LMDB environment of an unsharded conversion.
+        """
+        if len(self.shard_paths) > 1:
+            raise ValueError("Sharded conversions have one environment per shard")
+        return self.envs[0]
+
+    def keys(self) -> list[str]:
+        """
+        Return all patch keys of the LMDB database in the stored (sorted) order.
+        The keys of sharded conversions are merged into a single sorted list.
+        Reserved `rico-hdl` keys are skipped.
+        The keys are loaded from the key index if it matches the database
+        (see `key_index`), instead of iterating over all keys.
+        """
+        index = self.key_index()
+        if index is not None:
+            return [k.decode() for k in index["keys"].tolist()]
+        shard_keys = []
+        for env in self.envs:
+            with env.begin(write=False) as txn:
+                shard_keys.append(
+                    [
+                        k
+                        for k in txn.cursor().iternext(values=False)
+                        if not k.startswith(RESERVED_KEY_PREFIX)
+                    ]
+                )
+        return [k.decode() for k in heapq.merge(*shard_keys)]
+
+    def key_index(self) -> Optional[dict]:
+        """
+        Return the key index of the conversion (see `read_key_index`) or `None`
+        if it does not exist or does not match the database.
+        The index matches if it contains as many keys as the database stores
+        patches, which only requires the number of entries of each shard
+        and the few reserved keys.
+        """
+        index = read_key_index(self.path)
+        if index is None:
+            return None
+        num_keys = 0
+        for env in self.envs:
+            num_keys += env.stat()["entries"]
+            with env.begin(write=False) as txn:
+                cursor = txn.cursor()
+                if cursor.set_range(RESERVED_KEY_PREFIX):
+                    for key in cursor.iternext(values=False):
+                        if not key.startswith(RESERVED_KEY_PREFIX):
+                            break
+                        num_keys -= 1
+        return index if num_keys == len(index["keys"]) else None
+
+    def statistics(self) -> dict[str, dict]:
+        """
+        Return the per-band statistics of every sub-dataset that was encoded
+        with `--statistics`, keyed by the name of the sub-dataset.
+        """
+        statistics = {}
+        # the statistics are stored inside of every shard
+        with self.envs[0].begin(write=False) as txn:
+            cursor = txn.cursor()
+            if cursor.set_range(STATISTICS_KEY_PREFIX):
+                for key, value in cursor:
+                    if not key.startswith(STATISTICS_KEY_PREFIX):
+                        break
+                    name = key[len(STATISTICS_KEY_PREFIX) : -len(b"__")].decode()
+                    statistics[name] = json.loads(value)
+        return statistics
+
+    def get(self, key: Key, bands: Optional[Sequence[str]] = None):
+        """
+        Read the patch with the given `key`.
+        `bands` overrides the bands that were selected during initialization.
+        """
+        return self.get_many([key], bands=bands)[0]
+
+    def get_many(self, keys: Sequence[Key], bands: Optional[Sequence[str]] = None):
+        """
+        Read the patches of all `keys` within a single read transaction.
+        The results are returned in the order of the given `keys`.
+        `bands` overrides the bands that were selected during initialization.
+
+        The keys are visited in the sorted on-disk order with a single cursor.
+        As `rico-hdl` inserts the keys in sorted order, this turns a randomly
+        sampled minibatch into a mostly sequential page access pattern.
+        """
+        bands = bands if bands is not None else self.bands
+        results = [None] * len(keys)
+        for shard, indices in self._route(keys).items():
+            with self.envs[shard].begin(write=False, buffers=True) as txn:
+                buffers = self._sorted_buffers(txn, [keys[i] for i in indices], shard)
+                # the data has to be copied before the transaction ends
+                for i, buffer in zip(indices, buffers):
+                    header = self._compact_schema(txn, buffer, shard)[1]
+                    results[i] = decode_bands(buffer, bands, header)
+        return results
+
+    @contextmanager
+    def views(self, keys: Sequence[Key], bands: Optional[Sequence[str]] = None):
+        """
+        Provide zero-copy views of the selected `bands` of all `keys`.
+        Yields a list with one `{band: np.ndarray}` dictionary per key, in the order of
+        the given `keys`.
+        The arrays are read-only views into the LMDB memory map and are only valid
+        inside of the `with` block. Copy the data if it is required afterwards.
+
+        ```python
+        with reader.views(keys, bands=["B04", "B03", "B02"]) as batch:
+            rgb = np.stack([sample["B04"] for sample in batch])
+        ```
+        """
+        bands = bands if bands is not None else self.bands
+        results = [None] * len(keys)
+        with ExitStack() as stack:
+            for shard, indices in self._route(keys).items():
+                txn = stack.enter_context(
+                    self.envs[shard].begin(write=False, buffers=True)
+                )
+                buffers = self._sorted_buffers(txn, [keys[i] for i in indices], shard)
+                for i, buffer in zip(indices, buffers):
+                    header = self._compact_schema(txn, buffer, shard)[1]
+                    results[i] = band_views(buffer, bands, header)
+            yield results
+
+    def safetensors(self, key: Key) -> bytes:
+        """
+        Return the record of `key` as a standard serialized safetensors record,
+        which can be loaded with `safetensors.numpy.load`.
+        Dictionary compressed records are decompressed and the header of
+        compact records is restored.
+        """
+        shard = next(iter(self._route([key])))
+        with self.envs[shard].begin(write=False, buffers=True) as txn:
+            buffer = self._sorted_buffers(txn, [key], shard)[0]
+            schema = self._compact_schema(txn, buffer, shard)[0]
+            return restore_safetensors(buffer, schema)
+
+    def _route(self, keys: Sequence[Key]) -> dict[int, list[int]]:
+        """
+        Group the indexes of the `keys` by the shard that stores the key.
+        """
+        num_shards = len(self.shard_paths)
+        if num_shards == 1:
+            return {0: list(range(len(keys)))}
+        routes = {}
+        for i, key in enumerate(keys):
+            routes.setdefault(shard_index(encode_key(key), num_shards), []).append(i)
+        return routes
+
+    def _sorted_buffers(self, txn, keys: Sequence[Key], shard: int = 0) -> list:
+        """
+        Return the value buffers of all `keys` of the given `shard` in the order of
+        the given `keys` while visiting them in the sorted on-disk order with a single cursor.
+        Records that were compressed with a zstd dictionary are decompressed.
+        """
+        encoded_keys = [encode_key(key) for key in keys]
+        buffers = [None] * len(encoded_keys)
+        cursor = txn.cursor()
+        for i in sorted(range(len(encoded_keys)), key=encoded_keys.__getitem__):
+            key = encoded_keys[i]
+            if not cursor.set_range(key) or cursor.key() != key:
+                raise KeyError(keys[i])
+            buffers[i] = cursor.value()
+            if buffers[i][:4] == ZSTD_MAGIC:
+                buffers[i] = self._zstd_decompress(txn, buffers[i], shard)
+        return buffers
+
+    def _compact_schema(
+        self, txn, buffer, shard: int = 0
+    ) -> tuple[Optional[bytes], Optional[tuple[dict, dict, int]]]:
+        """
+        Return the schema and the parsed header of the compact record in `buffer`
+        or `(None, None)` for standard safetensors records.
+        The schema is loaded and parsed once per process from the database of the `shard`.
+        """
+        if bytes(buffer[: len(COMPACT_MAGIC)]) != COMPACT_MAGIC:
+            return None, None
+        (schema_id,) = struct.unpack_from("<I", buffer, len(COMPACT_MAGIC))
+        cache_key = (os.getpid(), self.shard_paths[shard].resolve(), schema_id)
+        if cache_key not in _COMPACT_SCHEMAS:
+            schema = txn.get(compact_schema_key(schema_id))
+            if schema is None:
+                raise KeyError(f"Missing compact record schema {schema_id}")
+            schema = bytes(schema)
+            _COMPACT_SCHEMAS[cache_key] = (
+                schema,
+                parse_header(schema, COMPACT_DATA_OFFSET),
+            )
+        return _COMPACT_SCHEMAS[cache_key]
+
+    def _zstd_decompress(self, txn, buffer, shard: int = 0) -> bytes:
+        """
+        Decompress a record that was compressed with a trained zstd dictionary.
+        The dictionary is loaded from the database of the `shard` once per process.
+        """
+        if zstandard is None:
+            raise ImportError(
+                'Reading dictionary compressed records requires the optional `zstd` extra: pip install "rico-hdl[zstd]"'
+            )
+        dict_id = zstandard.get_frame_parameters(buffer).dict_id
+        cache_key = (os.getpid(), self.shard_paths[shard].resolve(), dict_id)
+        if cache_key not in _ZSTD_DICTIONARIES:
+            dictionary = txn.get(zstd_dictionary_key(dict_id))
+            if dictionary is None:
+                raise KeyError(f"Missing zstd dictionary {dict_id}")
+            _ZSTD_DICTIONARIES[cache_key] = zstandard.ZstdCompressionDict(
+                bytes(dictionary)
+            )
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=_ZSTD_DICTIONARIES[cache_key]
+        )
+        return decompressor.decompress(buffer)
+
+
+class LMDBDataset:
+    """
+    A framework-independent map-style dataset over the patches of an
+    LMDB database that was created by `rico-hdl`.
+    It implements `__len__` and `__getitem__` and can directly be used with
+    a PyTorch `DataLoader`.
+
+    If no `keys` are given, all patch keys of the database are used.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        bands: Optional[Sequence[str]] = None,
+        keys: Optional[Sequence[Key]] = None,
+    ):
+        self.reader = LMDBReader(path, bands=bands)
+        self.keys = list(keys) if keys is not None else self.reader.keys()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getitem__(self, idx: int):
+        return self.reader.get(self.keys[idx])
+
+    def get_many(self, indices: Sequence[int]):
+        """
+        Read all patches of the given `indices` within a single read transaction.
+        """
+        return self.reader.get_many([self.keys[i] for i in indices])
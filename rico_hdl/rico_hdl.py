@@ -1,134 +1,87 @@
 import os
+import json
+import gzip
+import hashlib
+import struct
+import tempfile
+import zlib
 import typer
-from typing import TypeAlias, Optional
+from typing import TypeAlias, Optional, NamedTuple, Union, Iterator
 from typing_extensions import Annotated
 import lmdb
 from safetensors.numpy import save
 import sys
 import rasterio
+import numpy as np
 from pathlib import Path
-import subprocess
+import re
 import structlog
-from more_itertools import chunked
 from tqdm import tqdm
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from collections import deque
+import queue
+import threading
 import multiprocessing as mp
+from multiprocessing import shared_memory
+from contextlib import ExitStack, closing, contextmanager
+from functools import partial
 import warnings
 from rasterio.errors import NotGeoreferencedWarning
+from rasterio.enums import Resampling
+from rico_hdl.reader import (
+    COMPACT_MAGIC,
+    band_views,
+    compact_schema_key,
+    LMDBReader,
+    parse_safetensors_header,
+    read_key_index,
+    read_shards_manifest,
+    shard_index,
+    tensor_view,
+    zstd_dictionary_key,
+)
+from rico_hdl.tiff import read_simple_tiff
+from rico_hdl.constants import (
+    BIGEARTHNET_S2_ORDERING,
+    SSL4EO_S12_S1_ORDERING,
+    SSL4EO_S12_S2_L1C_ORDERING,
+    SSL4EO_S12_S2_L2A_ORDERING,
+    EUROSAT_MS_BANDS,
+    BIGEARTHNET_S1_ORDERING,
+    MAJOR_TOM_S1_ORDERING,
+    MAJOR_TOM_S2_ORDERING,
+    HYSPECNET_BANDS,
+    KEY_INDEX_FILE_NAME,
+    SPECTRAL_EARTH_BANDS,
+    UC_MERCED_BAND_IDX_COLOR_MAPPING,
+    HYDRO_BAND_IDX_BAND_MAPPING,
+    RESERVED_KEY_PREFIX,
+    STATISTICS_KEY_PREFIX,
+    SHARDS_MANIFEST_FILE_NAME,
+)
+
+try:
+    import blosc2
+except ImportError:
+    blosc2 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 log = structlog.get_logger()
 
-BIGEARTHNET_S2_ORDERING = [
-    "B02",
-    "B03",
-    "B04",
-    "B08",
-    "B05",
-    "B06",
-    "B07",
-    "B8A",
-    "B11",
-    "B12",
-    "B01",
-    "B09",
-]
-
-SSL4EO_S12_S1_ORDERING = ["VH", "VV"]
-SSL4EO_S12_S2_L1C_ORDERING = [
-    "B2",
-    "B3",
-    "B4",
-    "B8",
-    "B5",
-    "B6",
-    "B7",
-    "B8A",
-    "B10",
-    "B11",
-    "B12",
-    "B1",
-    "B9",
-]
-
-SSL4EO_S12_S2_L2A_ORDERING = [
-    "B2",
-    "B3",
-    "B4",
-    "B8",
-    "B5",
-    "B6",
-    "B7",
-    "B8A",
-    "B11",
-    "B12",
-    "B1",
-    "B9",
-]
-
-# Defined in the order of the bands!
-# Order taken from (and only implicitely confirmed in):
-# https://github.com/phelber/EuroSAT/issues/7#issuecomment-916754970
-# Visualizing the individual bands supports the ordering, as one
-# can see the different interpolation strengths for the 20 and 60m
-# bands.
-# This should be index band mapping and the ordering within the saftensor
-# can then be independent
-EUROSAT_MS_BANDS = [
-    "B01",
-    "B02",
-    "B03",
-    "B04",
-    "B05",
-    "B06",
-    "B07",
-    "B08",
-    "B09",
-    "B10",
-    "B11",
-    "B12",
-    "B08A",
-]
-
-BIGEARTHNET_S1_ORDERING = ["VH", "VV"]
-
-# Same as BigEarthNet ordering
-# for whatever reason decided to use lower case here
-MAJOR_TOM_S1_ORDERING = ["vh", "vv"]
-
-MAJOR_TOM_S2_ORDERING = [
-    "B02",
-    "B03",
-    "B04",
-    "B08",
-    "B05",
-    "B06",
-    "B07",
-    "B8A",
-    "B11",
-    "B12",
-    "B01",
-    "B09",
-]
-
-NUM_HYSPECNET_BANDS = 224
-NUM_SPECTRAL_EARTH_BANDS = 202
-# see output of `gdalinfo`
-UC_MERCED_BAND_IDX_COLOR_MAPPING = {1: "Red", 2: "Green", 3: "Blue"}
-
-HYDRO_BAND_IDX_BAND_MAPPING = {
-    1: "B01",
-    2: "B02",
-    3: "B03",
-    4: "B04",
-    5: "B05",
-    6: "B06",
-    7: "B07",
-    8: "B08",
-    9: "B8A",
-    10: "B09",
-    11: "B11",
-    12: "B12",
-}
+# Default thresholds after which the LMDB write transaction is committed.
+# The byte threshold ensures that datasets with large records (like HySpecNet-11k)
+# do not accumulate gigabytes of data in a single transaction.
+DEFAULT_COMMIT_RECORDS = 512
+DEFAULT_COMMIT_BYTES = 256 * 1024 * 1024
 
 GENERAL_HELP_TEXT = """\
 This CLI tool is a fast and easy-to-use *r*emote sensing *i*mage format *co*nverter
@@ -160,31 +113,757 @@ DatasetDir: TypeAlias = Annotated[
     ),
 ]
 
+Resume: TypeAlias = Annotated[
+    bool,
+    typer.Option(
+        help="Continue an interrupted conversion. Patches whose keys are already stored in the target LMDB are skipped before any file is read.",
+    ),
+]
+
+Update: TypeAlias = Annotated[
+    bool,
+    typer.Option(
+        help="Incrementally update an existing LMDB. Only new or changed patches are encoded and patches whose source disappeared are deleted.",
+    ),
+]
+
+Bands: TypeAlias = Annotated[
+    Optional[list[str]],
+    typer.Option(
+        help="Only encode the given bands in the given order. The option can be repeated or given as a comma-separated list. For datasets with multiple sensors, each sensor encodes the given bands that belong to it and sensors without any of the given bands are skipped. Defaults to all bands.",
+    ),
+]
+
+Compression: TypeAlias = Annotated[
+    Optional[str],
+    typer.Option(
+        help="Compress every band with `CODEC[:FILTER[:LEVEL]]`, for example `zstd:bytedelta:5`. Codecs: `blosclz`, `lz4`, `lz4hc`, `zlib`, `zstd`. Filters: `none`, `shuffle` (default), `bitshuffle`, `bytedelta`. Levels: 0-9 (default: 5). Requires the optional `compression` extra.",
+    ),
+]
+
+ZstdDictionarySamples: TypeAlias = Annotated[
+    Optional[int],
+    typer.Option(
+        min=1,
+        help="Train a zstd dictionary from the given number of sampled records and compress every record with it. Intended for datasets with small patches. Requires the optional `zstd` extra.",
+    ),
+]
+
+NumShards: TypeAlias = Annotated[
+    int,
+    typer.Option(
+        min=1,
+        help="Split the output into the given number of LMDB shards, each with its own writer. The keys are assigned to the shards by a stable hash of the key.",
+    ),
+]
 
-def open_lmdb(dir: str):
-    # 100 TB for map_size
+Part: TypeAlias = Annotated[
+    Optional[str],
+    typer.Option(
+        help="Only encode the part `INDEX/NUM_PARTS` of the sorted patches, for example `0/4`, to distribute a conversion across multiple nodes. The index starts at 0. Every part has to be written into its own target directory and the parts are combined with `rico-hdl merge`.",
+    ),
+]
+
+GdalConfig: TypeAlias = Annotated[
+    Optional[list[str]],
+    typer.Option(
+        help="Override a GDAL configuration option of the converter profile as `KEY=VALUE`, for example `GDAL_CACHEMAX=256`. Can be given multiple times.",
+    ),
+]
+
+# GDAL configuration options that are activated once in every worker process.
+# Every patch file is opened exactly once, so probing the directory for sidecar
+# files (`.aux.xml`, `.ovr`, ...) only adds latency, especially on network file systems.
+# The block cache (`GDAL_CACHEMAX` in MB) only has to hold the bands of a single patch
+# instead of the GDAL default of 5% of the memory in each of the worker processes.
+DEFAULT_GDAL_OPTIONS = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "GDAL_CACHEMAX": "16",
+}
+
+# Converter specific additions to the `DEFAULT_GDAL_OPTIONS`.
+# The hyperspectral patches store all bands in a single, larger file that
+# is decoded with multiple threads.
+GDAL_PROFILES = {
+    "hyspecnet_11k": {"GDAL_CACHEMAX": "32", "GDAL_NUM_THREADS": "2"},
+    "spectral_earth_enmap": {"GDAL_CACHEMAX": "32", "GDAL_NUM_THREADS": "2"},
+}
+
+Layout: TypeAlias = Annotated[
+    Optional[str],
+    typer.Option(
+        help="Storage layout of the bands: `bands` stores every band as its own safetensors entry (default) and `stacked` stores all bands with the same shape and data type as a single `(C, H, W)` entry.",
+    ),
+]
+
+LAYOUTS = ["bands", "stacked"]
+
+Resample: TypeAlias = Annotated[
+    Optional[str],
+    typer.Option(
+        help="Resample all Sentinel-2 bands to a common grid with the given resolution in meters as `RESOLUTION[:METHOD]`, for example `10:bilinear`. The methods are `nearest`, `bilinear` (default), and `cubic`. By default, every band is stored in its original resolution.",
+    ),
+]
+
+RESAMPLING_METHODS = ["nearest", "bilinear", "cubic"]
+
+Statistics: TypeAlias = Annotated[
+    bool,
+    typer.Option(
+        help="Compute the per-band count, mean, standard deviation, minimum, maximum, and histogram of integer bands while encoding and store them inside of the LMDB. Only available if all patches are encoded in a single run.",
+    ),
+]
+
+FileIndex: TypeAlias = Annotated[
+    bool,
+    typer.Option(
+        help="Cache the discovered source files in the `rico-hdl-file-index.json.gz` file inside of the target directory and reuse them as long as the modification times of the scanned directories are unchanged. Disable it if the source files may change without changing these modification times, for example, after an `rsync` that preserves them.",
+    ),
+]
+
+CommitRecords: TypeAlias = Annotated[
+    int,
+    typer.Option(
+        min=1,
+        help="Commit the LMDB write transaction after this many records. Larger transactions reduce the number of `fsync` calls but have to be rewritten on a crash. The thresholds change the layout of the LMDB file, so `rico-hdl merge` and `--resume` have to use the same values for a byte-identical result.",
+    ),
+]
+
+CommitBytes: TypeAlias = Annotated[
+    int,
+    typer.Option(
+        min=1,
+        help="Commit the LMDB write transaction after this many bytes, which bounds the size of a transaction for datasets with large records. See `--commit-records`.",
+    ),
+]
+
+Compact: TypeAlias = Annotated[
+    bool,
+    typer.Option(
+        help="Store the safetensors header, which is identical for all patches of a sub-dataset, only once inside of the LMDB and only the band data in each record. Cannot be combined with `--compression`.",
+    ),
+]
+
+# Number of equal-width bins of the histograms that cover the range of the integer data type
+STATISTICS_HISTOGRAM_BINS = 1024
+
+# Named database that stores the source fingerprint of each key for `--update`
+FINGERPRINTS_DB_NAME = RESERVED_KEY_PREFIX + b"fingerprints__"
+
+# The process pool that is shared by all `lmdb_writer` calls together with its
+# number of workers and GDAL configuration options, see `worker_pool`.
+_WORKER_POOL: Optional[tuple[tuple[int, dict], ProcessPoolExecutor]] = None
+
+# The GDAL environment of a worker process that is activated by `init_worker`.
+_GDAL_ENV = None
+
+# Serialized records that are at least this large are handed from the
+# worker processes to the LMDB writer via shared memory instead of pickling.
+# Smaller records are cheaper to pickle than to allocate a shared memory segment for.
+DEFAULT_SHARED_MEMORY_MIN_BYTES = 1024 * 1024
+
+# Name of the progress journal that is written next to the LMDB files.
+# It is NOT stored inside of the LMDB to keep the encoded data independent of it.
+JOURNAL_FILE_NAME = "rico-hdl-journal.json"
+
+# Name of the part manifest of a conversion that was split with `--part`.
+# It records the keys of each sub-dataset in insertion order, so that
+# `rico-hdl merge` can replay the writes of a single run.
+PART_MANIFEST_FILE_NAME = "rico-hdl-part.json"
+
+# Name of the file index that caches the discovered source paths of the converters.
+# It is written next to the LMDB files, like the journal.
+FILE_INDEX_FILE_NAME = "rico-hdl-file-index.json.gz"
+# The sub-datasets are discovered by concurrent threads that update the same file index
+_FILE_INDEX_LOCK = threading.Lock()
+
+
+def select_bands(
+    bands: Optional[list[str]], orderings: dict[str, list[str]]
+) -> dict[str, Optional[list[str]]]:
+    """
+    Resolve the `--bands` option for each (sub-)dataset of `orderings`, which maps
+    the name of the (sub-)dataset to its default band ordering.
+    Returns the bands that should be encoded for each (sub-)dataset in the order
+    given by `bands`. If `bands` is `None`, `None` is returned for each (sub-)dataset
+    to encode all bands in the default ordering.
+    (Sub-)datasets without any of the selected bands are skipped with a warning
+    and are not part of the result.
+
+    Exits the program if a band is unknown or if no band is selected at all.
+    """
+    if bands is None:
+        return {name: None for name in orderings}
+    # allow comma-separated lists and remove duplicates while keeping the order
+    selected = list(
+        dict.fromkeys(b.strip() for item in bands for b in item.split(",") if b.strip())
+    )
+    available = {b for ordering in orderings.values() for b in ordering}
+    unknown = [b for b in selected if b not in available]
+    if unknown:
+        log.error(f"Available bands: {', '.join(sorted(available))}")
+        sys.exit(f"Unknown bands selected: {', '.join(unknown)}")
+    selection = {}
+    for name, ordering in orderings.items():
+        name_bands = [b for b in selected if b in ordering]
+        if name_bands:
+            selection[name] = name_bands
+        else:
+            log.warning(f"Skipping {name}, as none of the selected bands belong to it")
+    if not selection:
+        sys.exit("No bands selected")
+    return selection
+
+
+def band_order_metadata(bands: Optional[list[str]]) -> Optional[dict[str, str]]:
+    """
+    Return the safetensors metadata that records the order of the selected `bands`,
+    as the safetensors format itself stores the tensors sorted by their name.
+    Returns `None` if the default bands are encoded, to keep the default
+    output unchanged.
+    """
+    if bands is None:
+        return None
+    return {"bands": ",".join(bands)}
+
+
+def parse_layout(layout: Optional[str]) -> Optional[str]:
+    """
+    Parse the `--layout` option.
+    Returns `None` for the default layout, which stores every band individually.
+
+    Exits the program if the layout is unknown.
+    """
+    if layout is None or layout == "bands":
+        return None
+    if layout not in LAYOUTS:
+        sys.exit(f"Invalid layout: {layout}; must be one of: {', '.join(LAYOUTS)}")
+    return layout
+
+
+class ResampleConfig(NamedTuple):
+    resolution: float
+    method: str
+
+
+def parse_resample(resample: Optional[str]) -> Optional[ResampleConfig]:
+    """
+    Parse the `--resample` option of the form `RESOLUTION[:METHOD]`.
+    Returns `None` if the bands should keep their original resolution.
+
+    Exits the program if the option is invalid.
+    """
+    if resample is None:
+        return None
+    resolution, _, method = resample.lower().partition(":")
+    method = method or "bilinear"
+    try:
+        resolution = float(resolution)
+    except ValueError:
+        sys.exit(f"Invalid resample: {resample}; expected RESOLUTION[:METHOD]")
+    if not resolution > 0:
+        sys.exit(f"Invalid resample resolution: {resolution}; must be positive")
+    if method not in RESAMPLING_METHODS:
+        sys.exit(
+            f"Invalid resample method: {method}; must be one of: {', '.join(RESAMPLING_METHODS)}"
+        )
+    return ResampleConfig(resolution, method)
+
+
+def resample_metadata(resample: Optional[ResampleConfig]) -> Optional[dict[str, str]]:
+    """
+    Return the safetensors metadata that records the resolution and the
+    interpolation method of the encode-time resampling.
+    Returns `None` if the bands keep their original resolution.
+    """
+    if resample is None:
+        return None
+    return {"resampling": json.dumps(resample._asdict())}
+
+
+def encode_bands(
+    data: dict[str, np.ndarray],
+    bands: Optional[list[str]],
+    layout: Optional[str],
+    metadata: Optional[dict[str, str]] = None,
+) -> bytes:
+    """
+    Serialize the `data` dictionary of bands into a safetensor dictionary.
+    `bands` are the selected bands that are recorded in the metadata (see `band_order_metadata`)
+    together with the additional `metadata`.
+
+    With the `stacked` layout, the bands of the same shape and data type
+    (for example, the 10m, 20m, and 60m bands of Sentinel-2) are stacked into a single
+    `(C, H, W)` tensor in the order of `data`.
+    Each stacked tensor is named by its shape, for example `120x120`, and the
+    band names of each stacked tensor are recorded in the `stacks` entry of the metadata.
+    """
+    if layout is None:
+        metadata = {**(band_order_metadata(bands) or {}), **(metadata or {})}
+        return save(data, metadata=metadata or None)
+    groups = {}
+    for band, arr in data.items():
+        groups.setdefault((arr.shape, arr.dtype), []).append(band)
+    # only add the data type to the name if it is required to distinguish the groups
+    num_dtypes = len({dtype for _, dtype in groups})
+    stacks = {}
+    tensors = {}
+    for (shape, dtype), names in groups.items():
+        name = "x".join(str(d) for d in shape)
+        if num_dtypes > 1:
+            name = f"{name}_{dtype}"
+        stacks[name] = names
+        tensors[name] = np.stack([data[band] for band in names])
+    return save(tensors, metadata={"stacks": json.dumps(stacks), **(metadata or {})})
+
+
+class PartConfig(NamedTuple):
+    index: int
+    num_parts: int
+
+
+def parse_part(part: Optional[str]) -> Optional[PartConfig]:
+    """
+    Parse the `--part` option of the form `INDEX/NUM_PARTS`.
+    Returns `None` if the conversion is not split into parts.
+
+    Exits the program if the option is invalid.
+    """
+    if part is None:
+        return None
+    index, _, num_parts = part.partition("/")
+    if not index.isdigit() or not num_parts.isdigit():
+        sys.exit(f"Invalid part: {part}; expected INDEX/NUM_PARTS")
+    if not int(index) < int(num_parts):
+        sys.exit(f"Invalid part: {part}; INDEX must be smaller than NUM_PARTS")
+    return PartConfig(int(index), int(num_parts))
+
+
+def parse_gdal_config(converter: str, overrides: Optional[list[str]]) -> dict[str, str]:
+    """
+    Return the GDAL configuration options of the `converter` profile
+    (see `GDAL_PROFILES`) updated with the `KEY=VALUE` `overrides` of `--gdal-config`.
+
+    Exits the program if an override is invalid.
+    """
+    options = {**DEFAULT_GDAL_OPTIONS, **GDAL_PROFILES.get(converter, {})}
+    for override in overrides or []:
+        key, sep, value = override.partition("=")
+        if not sep or not key:
+            sys.exit(
+                f"Invalid GDAL configuration option: {override}; expected KEY=VALUE"
+            )
+        options[key.upper()] = value
+    return options
+
+
+def part_paths(paths: list[str], part: PartConfig) -> list[str]:
+    """
+    Return the contiguous slice of the sorted `paths` that belongs to the `part`.
+    Concatenating the slices of all parts in index order returns the `paths`.
+    """
+    start = len(paths) * part.index // part.num_parts
+    end = len(paths) * (part.index + 1) // part.num_parts
+    return paths[start:end]
+
+
+class CompressionConfig(NamedTuple):
+    codec: str
+    filter: str
+    level: int
+
+
+COMPRESSION_CODECS = ["blosclz", "lz4", "lz4hc", "zlib", "zstd"]
+# byte-delta works on the shuffled bytes and has to be preceded by the shuffle filter
+COMPRESSION_FILTERS = {
+    "none": ["NOFILTER"],
+    "shuffle": ["SHUFFLE"],
+    "bitshuffle": ["BITSHUFFLE"],
+    "bytedelta": ["SHUFFLE", "BYTEDELTA"],
+}
+
+
+def parse_compression(compression: Optional[str]) -> Optional[CompressionConfig]:
+    """
+    Parse the `--compression` option of the form `CODEC[:FILTER[:LEVEL]]`.
+    Returns `None` if no compression is selected.
+
+    Exits the program if the option is invalid or if the optional
+    `compression` extra is not installed.
+    """
+    if compression is None:
+        return None
+    parts = compression.lower().split(":")
+    if len(parts) > 3:
+        sys.exit(f"Invalid compression: {compression}; expected CODEC[:FILTER[:LEVEL]]")
+    # fill in the default filter and level
+    codec, filter, level = parts + ["shuffle", "5"][len(parts) - 1 :]
+    if codec not in COMPRESSION_CODECS:
+        sys.exit(
+            f"Invalid compression: {compression}; codec must be one of: {', '.join(COMPRESSION_CODECS)}"
+        )
+    if filter not in COMPRESSION_FILTERS:
+        sys.exit(
+            f"Invalid compression filter: {filter}; must be one of: {', '.join(COMPRESSION_FILTERS)}"
+        )
+    if not level.isdigit() or int(level) > 9:
+        sys.exit(f"Invalid compression level: {level}; must be between 0 and 9")
+    if blosc2 is None:
+        sys.exit(
+            'Compression requires the optional `compression` extra: pip install "rico-hdl[compression]"'
+        )
+    return CompressionConfig(codec, filter, int(level))
+
+
+def compress_safetensor(value: bytes, compression: CompressionConfig) -> bytes:
+    """
+    Compress every band of the serialized safetensor `value` individually
+    and return a new serialized safetensor dictionary.
+    Each band is stored as a flat `uint8` tensor and the original `dtype` and `shape`
+    together with the `compression` settings are recorded in the `compression`
+    entry of the safetensor metadata. The remaining metadata is kept.
+    """
+    header, metadata, data_offset = parse_safetensors_header(value)
+    filters = [blosc2.Filter[f] for f in COMPRESSION_FILTERS[compression.filter]]
+    data = {}
+    band_infos = {}
+    for band, entry in header.items():
+        arr = tensor_view(value, entry, data_offset)
+        compressed = blosc2.compress2(
+            arr,
+            typesize=arr.dtype.itemsize,
+            codec=blosc2.Codec[compression.codec.upper()],
+            clevel=compression.level,
+            filters=filters,
+            # the bands are already compressed in parallel by the worker processes
+            nthreads=1,
+        )
+        data[band] = np.frombuffer(compressed, dtype=np.uint8)
+        band_infos[band] = {"dtype": entry["dtype"], "shape": entry["shape"]}
+    metadata["compression"] = json.dumps({**compression._asdict(), "bands": band_infos})
+    return save(data, metadata=metadata)
+
+
+def histogram_bin_width(dtype: np.dtype) -> int:
+    """
+    Return the width of the `STATISTICS_HISTOGRAM_BINS` bins that cover
+    the range of the integer `dtype`.
+    """
+    info = np.iinfo(dtype)
+    return -(-(int(info.max) - int(info.min) + 1) // STATISTICS_HISTOGRAM_BINS)
+
+
+def band_statistics(value: bytes) -> dict[str, dict]:
+    """
+    Compute the statistics of every band of the serialized safetensor `value`:
+    the number of values, their mean, the sum of squared differences from the
+    mean (`m2`, as in Welford's algorithm), the minimum, and the maximum.
+    The values of integer bands are additionally counted in histogram bins
+    (see `histogram_bin_width`), which are returned sparsely as the indexes
+    of the non-empty bins and their counts.
+    """
+    statistics = {}
+    for band, arr in band_views(value).items():
+        mean = arr.mean(dtype=np.float64)
+        entry = {
+            "dtype": arr.dtype.name,
+            "count": arr.size,
+            "mean": float(mean),
+            "m2": float(np.square(arr.astype(np.float64) - mean).sum()),
+            "min": arr.min().item(),
+            "max": arr.max().item(),
+        }
+        if np.issubdtype(arr.dtype, np.integer):
+            offsets = arr
+            if np.issubdtype(arr.dtype, np.signedinteger):
+                # `value - min` without overflow: flip the sign bit of the
+                # unsigned integer with the same width
+                unsigned = np.dtype(f"u{arr.dtype.itemsize}")
+                offsets = arr.view(unsigned) ^ unsigned.type(
+                    1 << (8 * arr.dtype.itemsize - 1)
+                )
+            # the bin width fits into the data type, so that the division stays unsigned
+            bin_width = offsets.dtype.type(histogram_bin_width(arr.dtype))
+            entry["histogram"] = np.unique(offsets // bin_width, return_counts=True)
+        statistics[band] = entry
+    return statistics
+
+
+def merge_band_statistics(total: dict[str, dict], statistics: dict[str, dict]):
+    """
+    Merge the `band_statistics` of a record into the `total` statistics in place.
+    The moments are combined with the parallel algorithm of Chan et al.
+    and the histograms of the `total` are dense.
+    """
+    for band, entry in statistics.items():
+        current = total.get(band)
+        if current is None:
+            current = total[band] = {**entry}
+            if "histogram" in entry:
+                current["histogram"] = np.zeros(STATISTICS_HISTOGRAM_BINS, np.int64)
+                bins, counts = entry["histogram"]
+                current["histogram"][bins] += counts
+            continue
+        count = current["count"] + entry["count"]
+        delta = entry["mean"] - current["mean"]
+        current["mean"] += delta * entry["count"] / count
+        current["m2"] += (
+            entry["m2"] + delta**2 * current["count"] * entry["count"] / count
+        )
+        current["count"] = count
+        current["min"] = min(current["min"], entry["min"])
+        current["max"] = max(current["max"], entry["max"])
+        if "histogram" in entry:
+            bins, counts = entry["histogram"]
+            current["histogram"][bins] += counts
+
+
+def finalize_band_statistics(total: dict[str, dict]) -> dict[str, dict]:
+    """
+    Convert the merged `total` statistics into the JSON serializable statistics
+    that are stored inside of the LMDB.
+    The standard deviation is the population standard deviation.
+    The histogram `counts` start at the `lower` bound of the data type and
+    trailing empty bins are dropped.
+    """
+    result = {}
+    for band, entry in total.items():
+        result[band] = {
+            "dtype": entry["dtype"],
+            "count": entry["count"],
+            "mean": entry["mean"],
+            "std": (entry["m2"] / entry["count"]) ** 0.5,
+            "min": entry["min"],
+            "max": entry["max"],
+        }
+        if "histogram" in entry:
+            counts = entry["histogram"]
+            num_bins = int(np.flatnonzero(counts)[-1]) + 1
+            result[band]["histogram"] = {
+                "lower": int(np.iinfo(entry["dtype"]).min),
+                "bin_width": histogram_bin_width(np.dtype(entry["dtype"])),
+                "counts": counts[:num_bins].tolist(),
+            }
+    return result
+
+
+def record_schema(safetensor_generator, path: str) -> bytes:
+    """
+    Return the safetensors JSON header of the record that the
+    `safetensor_generator` creates for the `path`.
+    """
+    value = safetensor_generator(path)
+    (header_size,) = struct.unpack_from("<Q", value, 0)
+    return value[8 : 8 + header_size]
+
+
+class CompactSchemaError(ValueError):
+    """
+    Raised by `compact_record` if the safetensors header of a record differs from the
+    shared schema. `encode_record` re-raises it with the source path as the only argument.
+    """
+
+
+def compact_record(schema: bytes, value: bytes) -> bytes:
+    """
+    Convert the serialized safetensor `value` into a compact record, which only stores
+    the `COMPACT_MAGIC`, the 4-byte id of the shared safetensors header `schema`,
+    and the band data.
+    The original record is restored with `restore_safetensors`.
+
+    Raises a `CompactSchemaError` if the header of `value` differs from the `schema`.
+    """
+    (header_size,) = struct.unpack_from("<Q", value, 0)
+    if value[8 : 8 + header_size] != schema:
+        raise CompactSchemaError("The safetensors header differs from the schema")
+    return (
+        COMPACT_MAGIC + struct.pack("<I", zlib.crc32(schema)) + value[8 + header_size :]
+    )
+
+
+def statistics_key(name: str) -> bytes:
+    """
+    Return the reserved LMDB key of the statistics of the sub-dataset `name`.
+    """
+    return STATISTICS_KEY_PREFIX + f"{name}__".encode()
+
+
+# Settings for the dictionary based zstd compression.
+# The sampled records are split into small blocks for training (like `zstd --train -B`),
+# as the training requires many samples and works best on small inputs.
+ZSTD_DICTIONARY_SIZE = 110 * 1024
+ZSTD_DICTIONARY_TRAINING_BLOCK_SIZE = 4096
+ZSTD_DICTIONARY_LEVEL = 9
+
+# Compressors of the worker processes, keyed by the shared memory segment of the dictionary.
+# A worker of the shared pool only loads each dictionary once.
+_ZSTD_COMPRESSORS: dict[str, "zstandard.ZstdCompressor"] = {}
+
+
+def train_zstd_dictionary(samples: list[bytes]) -> "zstandard.ZstdCompressionDict":
+    """
+    Train a zstd dictionary from the serialized `samples`.
+    The training is deterministic, so identical samples produce the identical dictionary.
+    """
+    if zstandard is None:
+        sys.exit(
+            'Dictionary compression requires the optional `zstd` extra: pip install "rico-hdl[zstd]"'
+        )
+    blocks = [
+        sample[i : i + ZSTD_DICTIONARY_TRAINING_BLOCK_SIZE]
+        for sample in samples
+        for i in range(0, len(sample), ZSTD_DICTIONARY_TRAINING_BLOCK_SIZE)
+    ]
+    # the dictionary should be much smaller than the training data
+    dict_size = min(ZSTD_DICTIONARY_SIZE, sum(len(s) for s in samples) // 10)
+    try:
+        return zstandard.train_dictionary(dict_size, blocks)
+    except zstandard.ZstdError as e:
+        sys.exit(f"Could not train the zstd dictionary: {e}. Try more samples.")
+
+
+def zstd_dictionary_compressor(
+    dictionary: "SharedMemoryRecord", level: int
+) -> "zstandard.ZstdCompressor":
+    """
+    Return the zstd compressor of the worker process for the trained dictionary
+    in the shared memory segment `dictionary`.
+    The compressor is only created once per worker process and dictionary.
+    """
+    if dictionary.name not in _ZSTD_COMPRESSORS:
+        shm = shared_memory.SharedMemory(name=dictionary.name)
+        data = bytes(shm.buf[: dictionary.size])
+        shm.close()
+        _ZSTD_COMPRESSORS[dictionary.name] = zstandard.ZstdCompressor(
+            level=level, dict_data=zstandard.ZstdCompressionDict(data)
+        )
+    return _ZSTD_COMPRESSORS[dictionary.name]
+
+
+def zstd_dictionary_compress(
+    dictionary: "SharedMemoryRecord", level: int, value: bytes
+) -> bytes:
+    """
+    Compress the serialized record `value` with the zstd dictionary
+    in the shared memory segment `dictionary`.
+    The dictionary id is part of the zstd frame, so that the reader can find the
+    dictionary in the LMDB.
+    """
+    return zstd_dictionary_compressor(dictionary, level).compress(value)
+
+
+# 100 TB for map_size
+# The map is reserved in the virtual address space, so all shards share it.
+LMDB_MAP_SIZE = 100 * 1024 * 1024 * 1024 * 1024
+
+
+def open_lmdb(dir: str, map_size: int = LMDB_MAP_SIZE):
     log.debug(f"Opening LMDB database: {dir}")
     return lmdb.open(
         str(dir),
         readonly=False,
         create=True,
-        map_size=(100 * 1024 * 1024 * 1024 * 1024),
+        map_size=map_size,
+        # required for the named fingerprints database of the `--update` mode
+        max_dbs=1,
     )
 
 
-def read_single_band_raster(path: Path, index: int = 1, is_georeferenced: bool = True):
-    if not is_georeferenced:
-        warnings.filterwarnings("ignore", category=NotGeoreferencedWarning)
+def shard_name(shard: int, num_shards: int) -> str:
+    return f"shard-{shard:05d}-of-{num_shards:05d}"
+
+
+def open_lmdb_shards(dir: Path, num_shards: int = 1) -> list:
+    """
+    Open the `num_shards` LMDB environments of the conversion at `dir`.
+    A single shard is the plain LMDB database at `dir`.
+    Multiple shards are stored in sub-directories of `dir` and the
+    shards manifest is written next to them, so that readers can route the keys.
+
+    Exits the program if the number of shards does not match an existing conversion.
+    """
+    manifest = read_shards_manifest(dir)
+    existing_num_shards = manifest["num_shards"] if manifest is not None else None
+    if existing_num_shards is None and Path(dir).joinpath("data.mdb").exists():
+        existing_num_shards = 1
+    if existing_num_shards not in (None, num_shards):
+        sys.exit(
+            f"{dir} already contains a conversion with {existing_num_shards} shard(s)"
+        )
+    if num_shards == 1:
+        return [open_lmdb(dir)]
+
+    shards = [shard_name(shard, num_shards) for shard in range(num_shards)]
+    if manifest is None:
+        Path(dir).mkdir(parents=True, exist_ok=True)
+        Path(dir).joinpath(SHARDS_MANIFEST_FILE_NAME).write_text(
+            json.dumps(
+                {"num_shards": num_shards, "routing": "crc32", "shards": shards},
+                indent=2,
+            )
+        )
+    return [
+        open_lmdb(Path(dir).joinpath(shard), map_size=LMDB_MAP_SIZE // num_shards)
+        for shard in shards
+    ]
+
+
+def read_single_band_raster(
+    path: Path, index: int = 1, resample: Optional[ResampleConfig] = None
+):
+    """
+    Read the band `index` from the raster file at `path`.
+    Simple, uncompressed single-band TIFF files are read directly without
+    constructing a GDAL dataset (see `read_simple_tiff`);
+    all other files are read with `rasterio`.
+
+    If `resample` is given, the band is resampled by GDAL to the grid with the
+    given resolution in the units of the raster's coordinate reference system.
+    Bands that are already in this resolution are returned unchanged.
+    """
+    if index == 1 and resample is None:
+        data = read_simple_tiff(path)
+        if data is not None:
+            return data
+    with rasterio.open(path) as r:
+        if resample is None:
+            return r.read(index)
+        x_res, y_res = r.res
+        out_shape = (
+            round(r.height * y_res / resample.resolution),
+            round(r.width * x_res / resample.resolution),
+        )
+        if out_shape == r.shape:
+            return r.read(index)
+        return r.read(
+            index,
+            out_shape=out_shape,
+            resampling=Resampling[resample.method],
+        )
+
+
+def read_multi_band_raster(path: Path, indexes: list[int]) -> np.ndarray:
+    """
+    Read all bands given by `indexes` from a single multi-band raster file.
+    The file is only opened once and all bands are decoded into a single
+    contiguous `(len(indexes), H, W)` array.
+    Iterating over the first axis returns views into this array,
+    which can be directly used as safetensor dictionary values.
+    """
     with rasterio.open(path) as r:
-        return r.read(index)
+        return r.read(indexes)
 
 
-def ssl4eo_s1_to_safetensor(patch_path: str) -> bytes:
+def ssl4eo_s1_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a SSL4EO-S12-S1 patch directory
     (NOT the individual TIFF files), read the individual
     band files in a pre-defined order and convert it
     into a serialized safetensor dictionary.
+    The encoded bands and their order can be selected via `bands`
+    and default to `SSL4EO_S12_S1_ORDERING`.
     """
     # In Python the dictionary insertion order is stable!
     # order the data here to make it clear that we are doing it
@@ -192,17 +871,21 @@ def ssl4eo_s1_to_safetensor(patch_path: str) -> bytes:
     p = Path(patch_path)
     data = {
         band: read_single_band_raster(p.joinpath(f"{band}.tif"))
-        for band in SSL4EO_S12_S1_ORDERING
+        for band in bands or SSL4EO_S12_S1_ORDERING
     }
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout)
 
 
-def ssl4eo_s2_l1c_to_safetensor(patch_path: str) -> bytes:
+def ssl4eo_s2_l1c_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a SSL4EO-S12-S2 L1C patch directory
     (NOT the individual TIFF files), read the individual
     band files in a pre-defined order and convert it
     into a serialized safetensor dictionary.
+    The encoded bands and their order can be selected via `bands`
+    and default to `SSL4EO_S12_S2_L1C_ORDERING`.
     """
     # In Python the dictionary insertion order is stable!
     # order the data here to make it clear that we are doing it
@@ -210,17 +893,21 @@ def ssl4eo_s2_l1c_to_safetensor(patch_path: str) -> bytes:
     p = Path(patch_path)
     data = {
         band: read_single_band_raster(p.joinpath(f"{band}.tif"))
-        for band in SSL4EO_S12_S2_L1C_ORDERING
+        for band in bands or SSL4EO_S12_S2_L1C_ORDERING
     }
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout)
 
 
-def ssl4eo_s2_l2a_to_safetensor(patch_path: str) -> bytes:
+def ssl4eo_s2_l2a_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a SSL4EO-S12-S2 L2A patch directory
     (NOT the individual TIFF files), read the individual
     band files in a pre-defined order and convert it
     into a serialized safetensor dictionary.
+    The encoded bands and their order can be selected via `bands`
+    and default to `SSL4EO_S12_S2_L2A_ORDERING`.
     """
     # In Python the dictionary insertion order is stable!
     # order the data here to make it clear that we are doing it
@@ -228,17 +915,21 @@ def ssl4eo_s2_l2a_to_safetensor(patch_path: str) -> bytes:
     p = Path(patch_path)
     data = {
         band: read_single_band_raster(p.joinpath(f"{band}.tif"))
-        for band in SSL4EO_S12_S2_L2A_ORDERING
+        for band in bands or SSL4EO_S12_S2_L2A_ORDERING
     }
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout)
 
 
-def bigearthnet_s1_to_safetensor(patch_path: str) -> bytes:
+def bigearthnet_s1_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a BigEarthNet-S1 patch directory
     (NOT the individual TIFF files), read the individual
     band files in a pre-defined order and convert it
     into a serialized safetensor dictionary.
+    The encoded bands and their order can be selected via `bands`
+    and default to `BIGEARTHNET_S1_ORDERING`.
     """
     # In Python the dictionary insertion order is stable!
     # order the data here to make it clear that we are doing it
@@ -246,27 +937,38 @@ def bigearthnet_s1_to_safetensor(patch_path: str) -> bytes:
     p = Path(patch_path)
     data = {
         band: read_single_band_raster(p.joinpath(f"{p.stem}_{band}.tif"))
-        for band in BIGEARTHNET_S1_ORDERING
+        for band in bands or BIGEARTHNET_S1_ORDERING
     }
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout)
 
 
-def bigearthnet_s2_to_safetensor(patch_path: str) -> bytes:
+def bigearthnet_s2_to_safetensor(
+    patch_path: str,
+    bands: Optional[list[str]] = None,
+    layout: Optional[str] = None,
+    resample: Optional[ResampleConfig] = None,
+) -> bytes:
     """
     Given the path to a BigEarthNet-S2 patch directory
     (NOT the individual TIFF files), read the individual
     band files in a pre-defined order and convert it
     into a serialized safetensor dictionary.
+    The encoded bands and their order can be selected via `bands`
+    and default to `BIGEARTHNET_S2_ORDERING`.
+    If `resample` is given, all bands are resampled to a common grid
+    and the resampling is recorded in the metadata.
     """
     # In Python the dictionary insertion order is stable!
     # order the data here to make it clear that we are doing it
     # to order the safetensor entries!
     p = Path(patch_path)
     data = {
-        band: read_single_band_raster(p.joinpath(f"{p.stem}_{band}.tif"))
-        for band in BIGEARTHNET_S2_ORDERING
+        band: read_single_band_raster(
+            p.joinpath(f"{p.stem}_{band}.tif"), resample=resample
+        )
+        for band in bands or BIGEARTHNET_S2_ORDERING
     }
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout, resample_metadata(resample))
 
 
 def bigearthnet_reference_map_to_safetensor(reference_map_path: str) -> bytes:
@@ -281,12 +983,16 @@ def bigearthnet_reference_map_to_safetensor(reference_map_path: str) -> bytes:
     return save(data, metadata=None)
 
 
-def major_tom_core_s1_to_safetensor(patch_path: str) -> bytes:
+def major_tom_core_s1_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a Major TOM Core S1 patch directory
     (NOT the individual TIFF files), read the individual
     band files in a pre-defined order and convert it
     into a serialized safetensor dictionary.
+    The encoded bands and their order can be selected via `bands`
+    and default to `MAJOR_TOM_S1_ORDERING`.
     """
     # In Python the dictionary insertion order is stable!
     # order the data here to make it clear that we are doing it
@@ -294,27 +1000,36 @@ def major_tom_core_s1_to_safetensor(patch_path: str) -> bytes:
     p = Path(patch_path)
     data = {
         band: read_single_band_raster(p.joinpath(f"{band}.tif"))
-        for band in MAJOR_TOM_S1_ORDERING
+        for band in bands or MAJOR_TOM_S1_ORDERING
     }
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout)
 
 
-def major_tom_core_s2_to_safetensor(patch_path: str) -> bytes:
+def major_tom_core_s2_to_safetensor(
+    patch_path: str,
+    bands: Optional[list[str]] = None,
+    layout: Optional[str] = None,
+    resample: Optional[ResampleConfig] = None,
+) -> bytes:
     """
     Given the path to a Major TOM Core S2 patch directory
     (NOT the individual TIFF files), read the individual
     band files in a pre-defined order and convert it
     into a serialized safetensor dictionary.
+    The encoded bands and their order can be selected via `bands`
+    and default to `MAJOR_TOM_S2_ORDERING`.
+    If `resample` is given, all bands are resampled to a common grid
+    and the resampling is recorded in the metadata.
     """
     # In Python the dictionary insertion order is stable!
     # order the data here to make it clear that we are doing it
     # to order the safetensor entries!
     p = Path(patch_path)
     data = {
-        band: read_single_band_raster(p.joinpath(f"{band}.tif"))
-        for band in MAJOR_TOM_S2_ORDERING
+        band: read_single_band_raster(p.joinpath(f"{band}.tif"), resample=resample)
+        for band in bands or MAJOR_TOM_S2_ORDERING
     }
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout, resample_metadata(resample))
 
 
 @app.command()
@@ -322,6 +1037,19 @@ def uc_merced(
     target_dir: TargetDir,
     dataset_dir: DatasetDir,
     num_workers: Annotated[int, typer.Option(min=1)] = None,
+    resume: Resume = False,
+    update: Update = False,
+    compression: Compression = None,
+    zstd_dictionary_samples: ZstdDictionarySamples = None,
+    num_shards: NumShards = 1,
+    part: Part = None,
+    gdal_config: GdalConfig = None,
+    layout: Layout = None,
+    statistics: Statistics = False,
+    compact: Compact = False,
+    file_index: FileIndex = True,
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
 ):
     """
     [UC Merced Land Use Dataset](http://weegee.vision.ucmerced.edu/datasets/landuse.html) converter.
@@ -333,19 +1061,39 @@ def uc_merced(
 
     NOTE: `num_workers` defaults to number of available threads.
     """
-    # FUTURE: Allow keeping it together and only have a single joined RGB tensor
-    # -> This is possible but kinda defeats the purpose of wrapping it in a saftensor
-    # For such a small dataset, it would be interesting to know if this extra stacking
-    # costs a lot of time.
+    compression_config = parse_compression(compression)
+    part_config = parse_part(part)
+    gdal_options = parse_gdal_config("uc_merced", gdal_config)
+    layout_config = parse_layout(layout)
+    # The channels are stored as a single joined RGB tensor with `--layout stacked`.
     log.info(f"Searching for patches in: {dataset_dir}")
-    patch_paths = fast_find(r".*\d\d\.tif$", dataset_dir, only_dir=False)
+    patch_paths = fast_find(
+        r".*\d\d\.tif$",
+        dataset_dir,
+        only_dir=False,
+        index_dir=target_dir if file_index else None,
+    )
     num_patch_paths = len(patch_paths)
     log.debug(f"Found {num_patch_paths} patches.")
     assert num_patch_paths > 0
-    env = open_lmdb(target_dir)
+    envs = open_lmdb_shards(target_dir, num_shards)
     log.debug("Writing UC Merced data into LMDB")
     lmdb_writer(
-        env, patch_paths, encode_stem, uc_merced_to_safetensor, max_workers=num_workers
+        envs,
+        patch_paths,
+        encode_stem,
+        partial(uc_merced_to_safetensor, layout=layout_config),
+        max_workers=num_workers,
+        resume=resume,
+        update=update,
+        compression=compression_config,
+        zstd_dictionary_samples=zstd_dictionary_samples,
+        part=part_config,
+        gdal_options=gdal_options,
+        statistics=statistics,
+        compact=compact,
+        commit_records=commit_records,
+        commit_bytes=commit_bytes,
     )
 
 
@@ -354,6 +1102,20 @@ def hydro(
     target_dir: TargetDir,
     dataset_dir: DatasetDir,
     num_workers: Annotated[int, typer.Option(min=1)] = None,
+    resume: Resume = False,
+    update: Update = False,
+    compression: Compression = None,
+    zstd_dictionary_samples: ZstdDictionarySamples = None,
+    num_shards: NumShards = 1,
+    part: Part = None,
+    gdal_config: GdalConfig = None,
+    layout: Layout = None,
+    statistics: Statistics = False,
+    compact: Compact = False,
+    file_index: FileIndex = True,
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
+    bands: Bands = None,
 ):
     """
     [Hydro -- A Foundation Model for Water in Sattelite Imagery](https://github.com/isaaccorley/hydro-foundation-model/tree/main) converter.
@@ -372,22 +1134,44 @@ def hydro(
 
     NOTE: `num_workers` defaults to number of available threads.
     """
+    compression_config = parse_compression(compression)
+    part_config = parse_part(part)
+    gdal_options = parse_gdal_config("hydro", gdal_config)
+    layout_config = parse_layout(layout)
+    selected_bands = select_bands(
+        bands, {"hydro": list(HYDRO_BAND_IDX_BAND_MAPPING.values())}
+    )["hydro"]
     log.info(f"Searching for patches in: {dataset_dir}")
     # the lmdb key will be the name itself without .tif suffix
     # and the safetensor would be produced from this file
     # Remember: Hydro has multiple bands per file!
-    patch_paths = fast_find(r"patch_\d+.tif$", dataset_dir, only_dir=False)
+    patch_paths = fast_find(
+        r"patch_\d+.tif$",
+        dataset_dir,
+        only_dir=False,
+        index_dir=target_dir if file_index else None,
+    )
     num_patch_paths = len(patch_paths)
     log.debug(f"Found {num_patch_paths} patches.")
     assert num_patch_paths > 0
-    env = open_lmdb(target_dir)
+    envs = open_lmdb_shards(target_dir, num_shards)
     log.debug("Writing Hydro data into LMDB")
     lmdb_writer(
-        env,
+        envs,
         patch_paths,
         encode_stem,
-        hydro_to_safetensor,
+        partial(hydro_to_safetensor, bands=selected_bands, layout=layout_config),
         max_workers=num_workers,
+        resume=resume,
+        update=update,
+        compression=compression_config,
+        zstd_dictionary_samples=zstd_dictionary_samples,
+        part=part_config,
+        gdal_options=gdal_options,
+        statistics=statistics,
+        compact=compact,
+        commit_records=commit_records,
+        commit_bytes=commit_bytes,
     )
 
 
@@ -398,6 +1182,20 @@ def eurosat_multi_spectral(
     target_dir: TargetDir,
     dataset_dir: DatasetDir,
     num_workers: Annotated[int, typer.Option(min=1)] = None,
+    resume: Resume = False,
+    update: Update = False,
+    compression: Compression = None,
+    zstd_dictionary_samples: ZstdDictionarySamples = None,
+    num_shards: NumShards = 1,
+    part: Part = None,
+    gdal_config: GdalConfig = None,
+    layout: Layout = None,
+    statistics: Statistics = False,
+    compact: Compact = False,
+    file_index: FileIndex = True,
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
+    bands: Bands = None,
 ):
     """
     [EuroSAT Multi-Spectral](https://doi.org/10.5281/zenodo.7711810) converter.
@@ -415,17 +1213,43 @@ def eurosat_multi_spectral(
 
     NOTE: `num_workers` defaults to number of available threads.
     """
+    compression_config = parse_compression(compression)
+    part_config = parse_part(part)
+    gdal_options = parse_gdal_config("eurosat_multi_spectral", gdal_config)
+    layout_config = parse_layout(layout)
+    selected_bands = select_bands(bands, {"eurosat_multi_spectral": EUROSAT_MS_BANDS})[
+        "eurosat_multi_spectral"
+    ]
     log.info(f"Searching for patches in: {dataset_dir}")
     # this could match the file paths directly
-    patch_paths = fast_find(r".*\d+\.tif$", dataset_dir, only_dir=False)
+    patch_paths = fast_find(
+        r".*\d+\.tif$",
+        dataset_dir,
+        only_dir=False,
+        index_dir=target_dir if file_index else None,
+    )
     num_patch_paths = len(patch_paths)
     log.debug(f"Found {num_patch_paths} patches.")
     assert num_patch_paths > 0
-    env = open_lmdb(target_dir)
+    envs = open_lmdb_shards(target_dir, num_shards)
     log.debug("Writing EuroSAT_MS data into LMDB")
     # Understand what the Band mapping is!
     lmdb_writer(
-        env, patch_paths, encode_stem, eurosat_ms_to_safetensor, max_workers=num_workers
+        envs,
+        patch_paths,
+        encode_stem,
+        partial(eurosat_ms_to_safetensor, bands=selected_bands, layout=layout_config),
+        max_workers=num_workers,
+        resume=resume,
+        update=update,
+        compression=compression_config,
+        zstd_dictionary_samples=zstd_dictionary_samples,
+        part=part_config,
+        gdal_options=gdal_options,
+        statistics=statistics,
+        compact=compact,
+        commit_records=commit_records,
+        commit_bytes=commit_bytes,
     )
 
 
@@ -434,6 +1258,20 @@ def spectral_earth_enmap(
     target_dir: TargetDir,
     dataset_dir: DatasetDir,
     num_workers: Annotated[int, typer.Option(min=1)] = None,
+    resume: Resume = False,
+    update: Update = False,
+    compression: Compression = None,
+    zstd_dictionary_samples: ZstdDictionarySamples = None,
+    num_shards: NumShards = 1,
+    part: Part = None,
+    gdal_config: GdalConfig = None,
+    layout: Layout = None,
+    statistics: Statistics = False,
+    compact: Compact = False,
+    file_index: FileIndex = True,
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
+    bands: Bands = None,
 ):
     """
     [EnMAP HSI - SpectralEarth](https://geoservice.dlr.de/web/datasets/enmap_spectralearth)
@@ -441,22 +1279,45 @@ def spectral_earth_enmap(
     Provide the path to the `spectral_earth/enmap` directory of the SpectralEarth dataset.
     The LMDB keys will be the names of the enmap `patches_directory/patch_name`.
     """
+    compression_config = parse_compression(compression)
+    part_config = parse_part(part)
+    gdal_options = parse_gdal_config("spectral_earth_enmap", gdal_config)
+    layout_config = parse_layout(layout)
+    selected_bands = select_bands(
+        bands, {"spectral_earth_enmap": SPECTRAL_EARTH_BANDS}
+    )["spectral_earth_enmap"]
     log.info(f"Searching for patches in: {dataset_dir}")
     # Remember: `SpectralEarth` has multiple bands per file!
     patch_paths = fast_find(
-        r"\d+.tif$", str(dataset_dir), only_dir=False, exact_depth=2
+        r"\d+.tif$",
+        str(dataset_dir),
+        only_dir=False,
+        exact_depth=2,
+        index_dir=target_dir if file_index else None,
     )
     num_patch_paths = len(patch_paths)
     log.debug(f"Found {num_patch_paths} patches.")
     assert num_patch_paths > 0
-    env = open_lmdb(str(target_dir))
+    envs = open_lmdb_shards(target_dir, num_shards)
     log.debug("Writing SpectralEarth enmap data into LMDB")
     lmdb_writer(
-        env,
+        envs,
         patch_paths,
         encode_with_parent,
-        spectral_earth_to_safetensor,
+        partial(
+            spectral_earth_to_safetensor, bands=selected_bands, layout=layout_config
+        ),
         max_workers=num_workers,
+        resume=resume,
+        update=update,
+        compression=compression_config,
+        zstd_dictionary_samples=zstd_dictionary_samples,
+        part=part_config,
+        gdal_options=gdal_options,
+        statistics=statistics,
+        compact=compact,
+        commit_records=commit_records,
+        commit_bytes=commit_bytes,
     )
 
 
@@ -465,6 +1326,20 @@ def hyspecnet_11k(
     target_dir: TargetDir,
     dataset_dir: DatasetDir,
     num_workers: Annotated[int, typer.Option(min=1)] = None,
+    resume: Resume = False,
+    update: Update = False,
+    compression: Compression = None,
+    zstd_dictionary_samples: ZstdDictionarySamples = None,
+    num_shards: NumShards = 1,
+    part: Part = None,
+    gdal_config: GdalConfig = None,
+    layout: Layout = None,
+    statistics: Statistics = False,
+    compact: Compact = False,
+    file_index: FileIndex = True,
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
+    bands: Bands = None,
 ):
     """
     [HySpecNet-11k](https://datadryad.org/stash/dataset/doi:10.5061/dryad.fttdz08zh) converter.
@@ -478,19 +1353,45 @@ def hyspecnet_11k(
 
     NOTE: `num_workers` defaults to number of available threads.
     """
+    compression_config = parse_compression(compression)
+    part_config = parse_part(part)
+    gdal_options = parse_gdal_config("hyspecnet_11k", gdal_config)
+    layout_config = parse_layout(layout)
+    selected_bands = select_bands(bands, {"hyspecnet_11k": HYSPECNET_BANDS})[
+        "hyspecnet_11k"
+    ]
     log.info(f"Searching for patches in: {dataset_dir}")
     # this could match the file paths directly
     # the lmdb key would be the name itself without SPECTRAL_IMAGE.TIF
     # and the safetensor would be produced from this file
     # Remember: hyspecnet has multiple bands per file!
-    patch_paths = fast_find(r"ENMAP.*?_L2A.*-Y\d+_X\d+$", dataset_dir, only_dir=True)
+    patch_paths = fast_find(
+        r"ENMAP.*?_L2A.*-Y\d+_X\d+$",
+        dataset_dir,
+        only_dir=True,
+        index_dir=target_dir if file_index else None,
+    )
     num_patch_paths = len(patch_paths)
     log.debug(f"Found {num_patch_paths} patches.")
     assert num_patch_paths > 0
-    env = open_lmdb(target_dir)
+    envs = open_lmdb_shards(target_dir, num_shards)
     log.debug("Writing HyspecNet-11k data into LMDB")
     lmdb_writer(
-        env, patch_paths, encode_stem, hyspecnet_to_safetensor, max_workers=num_workers
+        envs,
+        patch_paths,
+        encode_stem,
+        partial(hyspecnet_to_safetensor, bands=selected_bands, layout=layout_config),
+        max_workers=num_workers,
+        resume=resume,
+        update=update,
+        compression=compression_config,
+        zstd_dictionary_samples=zstd_dictionary_samples,
+        part=part_config,
+        gdal_options=gdal_options,
+        statistics=statistics,
+        compact=compact,
+        commit_records=commit_records,
+        commit_bytes=commit_bytes,
     )
 
 
@@ -525,24 +1426,26 @@ def encode_three_levels(path: str, join_char: str = "_") -> bytes:
     return join_char.join([p.parent.parent.name, p.parent.name, p.name]).encode()
 
 
-def eurosat_ms_to_safetensor(patch_path: str) -> bytes:
+def eurosat_ms_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a multi-spectral EuroSAT patch file (`.tif` file),
     read the individual bands and write them as entries
     into a serialized safetensor dictionary.
     The keys map to the band name specified in the [EuroSAT paper](https://ieeexplore.ieee.org/abstract/document/8736785)
     (one of: `B01`, `B02`, `B03`, `B04`, `B05`, `B06`, `B07`, `B08`, `B08A`, `B09`, `B10`, `B11`, `B12`)
+    The encoded bands and their order can be selected via `bands`.
     """
     p = Path(patch_path)
-    data = {
-        name: read_single_band_raster(p, index=idx)
-        for idx, name in enumerate(EUROSAT_MS_BANDS, start=1)
-    }
+    band_names = bands or EUROSAT_MS_BANDS
+    band_idxs = [EUROSAT_MS_BANDS.index(band) + 1 for band in band_names]
+    data = dict(zip(band_names, read_multi_band_raster(p, band_idxs)))
 
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout)
 
 
-def uc_merced_to_safetensor(patch_path: str) -> bytes:
+def uc_merced_to_safetensor(patch_path: str, layout: Optional[str] = None) -> bytes:
     """
     Given the path to a UC Merced patch file (`.tif` file),
     read the individual bands and write them as entries
@@ -550,62 +1453,159 @@ def uc_merced_to_safetensor(patch_path: str) -> bytes:
     The keys map to the color band value (`Red`, `Green`, `Blue`).
     """
     p = Path(patch_path)
-    data = {
-        color: read_single_band_raster(p, index=idx, is_georeferenced=False)
-        for idx, color in UC_MERCED_BAND_IDX_COLOR_MAPPING.items()
-    }
+    bands = read_multi_band_raster(p, list(UC_MERCED_BAND_IDX_COLOR_MAPPING.keys()))
+    data = dict(zip(UC_MERCED_BAND_IDX_COLOR_MAPPING.values(), bands))
 
-    return save(data, metadata=None)
+    return encode_bands(data, None, layout)
 
 
-def hydro_to_safetensor(patch_path: str) -> bytes:
+def hydro_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a Hydro patch file (`.tif` file),
     read the individual bands and write them as entries
     into a serialized safetensor dictionary.
+    The encoded bands and their order can be selected via `bands`.
     """
     p = Path(patch_path)
-    data = {
-        band: read_single_band_raster(p, index=idx, is_georeferenced=False)
-        for idx, band in HYDRO_BAND_IDX_BAND_MAPPING.items()
-    }
+    band_name_to_idx = {band: idx for idx, band in HYDRO_BAND_IDX_BAND_MAPPING.items()}
+    band_names = bands or list(band_name_to_idx.keys())
+    data = dict(
+        zip(
+            band_names,
+            read_multi_band_raster(p, [band_name_to_idx[band] for band in band_names]),
+        )
+    )
 
-    return save(data, metadata=None)
+    return encode_bands(data, bands, layout)
 
 
-def hyspecnet_to_safetensor(patch_path: str) -> bytes:
+def hyspecnet_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a HySpecNet-11k patch directory
     (NOT the individual TIFF file), read the individual
     bands from the SPECTRAL_IMAGE.TIF file and write them as
     entries into a serialized safetensor dictionary.
-    The keys are the integer encoded band values.
+    The keys are the integer encoded band values prefixed with `B`.
+    The encoded bands and their order can be selected via `bands`.
     """
-    # get number of bands for tiff
-    # for i in range: read_single band
     p = Path(patch_path)
-    data = {
-        f"B{band_idx}": read_single_band_raster(
-            p.joinpath(f"{p.stem}-SPECTRAL_IMAGE.TIF"), index=band_idx
+    band_names = bands or HYSPECNET_BANDS
+    band_idxs = [HYSPECNET_BANDS.index(band) + 1 for band in band_names]
+    # open the file only once and decode all bands in a single pass
+    data = dict(
+        zip(
+            band_names,
+            read_multi_band_raster(
+                p.joinpath(f"{p.stem}-SPECTRAL_IMAGE.TIF"), band_idxs
+            ),
         )
-        for band_idx in range(1, NUM_HYSPECNET_BANDS + 1)
-    }
-    return save(data, metadata=None)
+    )
+    return encode_bands(data, bands, layout)
 
 
-def spectral_earth_to_safetensor(patch_path: str) -> bytes:
+def spectral_earth_to_safetensor(
+    patch_path: str, bands: Optional[list[str]] = None, layout: Optional[str] = None
+) -> bytes:
     """
     Given the path to a SpectralEarth enmap patch TIFF file,
     read the individual bands from the given TIF file and
     write them as entries into a serialized safetensor dictionary.
     The keys are the integer encoded band values prefixed with `B`.
+    The encoded bands and their order can be selected via `bands`.
     """
     p = Path(patch_path)
-    data = {
-        f"B{band_idx}": read_single_band_raster(p, index=band_idx)
-        for band_idx in range(1, NUM_SPECTRAL_EARTH_BANDS + 1)
-    }
-    return save(data, metadata=None)
+    band_names = bands or SPECTRAL_EARTH_BANDS
+    band_idxs = [SPECTRAL_EARTH_BANDS.index(band) + 1 for band in band_names]
+    data = dict(zip(band_names, read_multi_band_raster(p, band_idxs)))
+    return encode_bands(data, bands, layout)
+
+
+def scan_directory(
+    path: str,
+    depth: int,
+    pattern: re.Pattern,
+    only_dir: bool,
+    exact_depth: Optional[int],
+) -> tuple[Optional[int], list[str], list[str]]:
+    """
+    List the entries of the directory `path`, which are at the given `depth`
+    relative to the search directory.
+    Returns the modification time of the directory in nanoseconds, the paths of
+    the matching entries, and the sub-directories that have to be scanned next.
+    Like `fd`, hidden entries are skipped and symbolic links are not followed.
+    """
+    mtime_ns = None
+    matches = []
+    sub_dirs = []
+    try:
+        # read before listing, so that a concurrent change invalidates the file index
+        mtime_ns = os.stat(path).st_mtime_ns
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if (
+                    (exact_depth is None or depth == exact_depth)
+                    and (is_dir or not only_dir)
+                    and pattern.search(entry.name)
+                ):
+                    matches.append(entry.path)
+                if is_dir and (exact_depth is None or depth < exact_depth):
+                    sub_dirs.append(entry.path)
+    except OSError as e:
+        log.warning(f"Could not scan {path}: {e}")
+    return mtime_ns, matches, sub_dirs
+
+
+def iter_find(
+    regex: str,
+    search_directory: str,
+    only_dir: bool = True,
+    threads: int = os.cpu_count(),
+    exact_depth: Optional[int] = None,
+    scanned_dirs: Optional[dict[str, Optional[int]]] = None,
+) -> Iterator[str]:
+    """
+    Yield the absolute paths of all files/directories below `search_directory`
+    whose name matches the given regular expression as soon as they are found.
+    The directories are scanned in parallel with `threads` threads, which is especially
+    useful for slow network-attached storage solutions or slow hard-drives.
+    The paths are yielded in no particular order.
+
+    The regular expression semantics follow `fd`: the expression is searched in the
+    name of the entry and is case-insensitive unless it contains an uppercase character.
+
+    If `scanned_dirs` is given, the modification time of every scanned directory
+    is stored in it.
+    """
+    # `fd` smart case: escape sequences like `\d` or `\S` do not count as uppercase
+    flags = 0 if any(c.isupper() for c in re.sub(r"\\.", "", regex)) else re.IGNORECASE
+    scan = partial(
+        scan_directory,
+        pattern=re.compile(regex, flags),
+        only_dir=only_dir,
+        exact_depth=exact_depth,
+    )
+    # scandir releases the GIL, so threads are sufficient
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        root = os.path.abspath(search_directory)
+        pending = {pool.submit(scan, root, 1): (root, 1)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, depth = pending.pop(future)
+                mtime_ns, matches, sub_dirs = future.result()
+                if scanned_dirs is not None:
+                    scanned_dirs[path] = mtime_ns
+                yield from matches
+                for sub_dir in sub_dirs:
+                    sub_future = pool.submit(scan, sub_dir, depth + 1)
+                    pending[sub_future] = (sub_dir, depth + 1)
 
 
 def fast_find(
@@ -614,28 +1614,186 @@ def fast_find(
     only_dir: bool = True,
     threads: int = os.cpu_count(),
     exact_depth: Optional[int] = None,
+    index_dir: Optional[Path] = None,
 ) -> list[str]:
     """
-    Use `fd` to quickly find all files/directories that match a given regular expression.
+    Quickly find all files/directories that match a given regular expression
+    with `iter_find` and return the list of absolute paths.
     Will default to using `os.cpu_count()` number of threads.
-    This highly optimized program is especially useful for slow network-attached storage solutions
-    or slow hard-drives.
-    """
-    return subprocess.check_output(
-        [
-            "fd",
-            "--no-ignore",
-            "--show-errors",
-            f"--threads={threads}",  # use number of available CPU cores by default
-            f"--base-directory={search_directory}",
-            "--absolute-path",  # absolute path required as we cd to the base-directory
-            "--regex",
-            regex,
+
+    If `index_dir` is given, the result is cached in the file index inside of
+    `index_dir` together with the modification times of all scanned directories.
+    A later call with the same arguments returns the cached paths without
+    scanning, as long as none of these directories changed.
+    """
+    if index_dir is None:
+        return list(iter_find(regex, search_directory, only_dir, threads, exact_depth))
+    root = os.path.abspath(search_directory)
+    index_key = json.dumps([root, regex, only_dir, exact_depth])
+    entry = read_file_index(index_dir).get(index_key)
+    if entry is not None and is_file_index_entry_valid(entry, root, threads):
+        log.debug(f"Using the file index for: {root}")
+        return [os.path.join(root, p) for p in entry["paths"]]
+
+    scanned_dirs = {}
+    paths = list(iter_find(regex, root, only_dir, threads, exact_depth, scanned_dirs))
+    # an unreadable directory has no modification time and cannot be validated
+    if None not in scanned_dirs.values():
+        write_file_index_entry(
+            index_dir,
+            index_key,
+            {
+                "paths": [os.path.relpath(p, root) for p in paths],
+                "dirs": {os.path.relpath(d, root): m for d, m in scanned_dirs.items()},
+            },
+        )
+    return paths
+
+
+def find_patches(name: str, regex: str, search_directory: Path, **kwargs) -> list[str]:
+    """
+    Find the patches of the (sub-)dataset `name` with `fast_find` and ensure
+    that at least one patch is found.
+    The keyword arguments are passed to `fast_find`.
+    """
+    log.info(f"Searching for {name} patches in: {search_directory}")
+    patch_paths = fast_find(regex, search_directory, **kwargs)
+    log.debug(f"Found {len(patch_paths)} {name} patches.")
+    assert len(patch_paths) > 0
+    return patch_paths
+
+
+def read_file_index(index_dir: Path) -> dict:
+    """
+    Read the file index from the `index_dir`.
+    Returns an empty dictionary if no file index exists.
+    """
+    index_path = Path(index_dir).joinpath(FILE_INDEX_FILE_NAME)
+    if not index_path.exists():
+        return {}
+    with gzip.open(index_path, "rt") as f:
+        return json.load(f)
+
+
+def write_file_index_entry(index_dir: Path, key: str, entry: dict):
+    """
+    Update the file index entry `key` inside of the `index_dir`.
+    The update is serialized across threads and the file index is replaced atomically
+    via a unique temporary file.
+    """
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    index_path = Path(index_dir).joinpath(FILE_INDEX_FILE_NAME)
+    with _FILE_INDEX_LOCK:
+        index = read_file_index(index_dir)
+        index[key] = entry
+        with tempfile.NamedTemporaryFile(
+            dir=index_dir, prefix=f"{FILE_INDEX_FILE_NAME}.", delete=False
+        ) as tmp:
+            with gzip.open(tmp, "wt") as f:
+                json.dump(index, f)
+        os.replace(tmp.name, index_path)
+
+
+def write_key_index_entry(
+    target_dir: Path,
+    name: str,
+    keys: list[bytes],
+    sizes: list[int],
+    bands: Optional[dict],
+):
+    """
+    Update the `keys`, record `sizes`, and `bands` of the sub-dataset `name`
+    in the key index (see `read_key_index`) inside of the `target_dir`.
+    The key index is replaced atomically.
+    """
+    index = read_key_index(target_dir)
+    datasets = {}
+    if index is not None:
+        for i, dataset in enumerate(index["datasets"]):
+            is_dataset = index["dataset_ids"] == i
+            datasets[dataset["name"]] = (
+                dataset["bands"],
+                index["keys"][is_dataset].tolist(),
+                index["sizes"][is_dataset].tolist(),
+            )
+    datasets[name] = (bands, keys, sizes)
+    all_keys = np.array(
+        [key for _, keys, _ in datasets.values() for key in keys], dtype=bytes
+    )
+    all_sizes = np.array(
+        [size for _, _, sizes in datasets.values() for size in sizes], dtype=np.uint64
+    )
+    dataset_ids = np.repeat(
+        np.arange(len(datasets), dtype=np.uint16),
+        [len(keys) for _, keys, _ in datasets.values()],
+    )
+    order = np.argsort(all_keys, kind="stable")
+    index_path = Path(target_dir).joinpath(KEY_INDEX_FILE_NAME)
+    tmp_path = index_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            keys=all_keys[order],
+            sizes=all_sizes[order],
+            dataset_ids=dataset_ids[order],
+            datasets=np.array(
+                json.dumps(
+                    [
+                        {"name": name, "bands": bands}
+                        for name, (bands, _, _) in datasets.items()
+                    ]
+                )
+            ),
+        )
+    os.replace(tmp_path, index_path)
+
+
+def record_sizes(envs, keys: list[bytes]) -> list[int]:
+    """
+    Return the sizes in bytes of the records of the `keys` inside of the LMDB shards `envs`.
+    The record data itself is not accessed.
+    """
+    with ExitStack() as stack:
+        txns = [
+            stack.enter_context(env.begin(write=False, buffers=True)) for env in envs
         ]
-        + (["--type=directory"] if only_dir else [])
-        + ([f"--exact-depth={exact_depth}"] if exact_depth is not None else []),
-        text=True,
-    ).splitlines()
+        return [len(txns[shard_index(key, len(txns))].get(key)) for key in keys]
+
+
+def record_bands(safetensor_generator, path: str) -> dict[str, dict]:
+    """
+    Return the data type and shape of every band of the record that the
+    `safetensor_generator` creates for the `path`.
+    """
+    return {
+        band: {"dtype": view.dtype.name, "shape": list(view.shape)}
+        for band, view in band_views(safetensor_generator(path)).items()
+    }
+
+
+def directory_mtime(path: str) -> Optional[int]:
+    """
+    Return the modification time of the directory `path` in nanoseconds
+    or `None` if it does not exist anymore.
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def is_file_index_entry_valid(entry: dict, root: str, threads: int) -> bool:
+    """
+    Check if none of the directories that were scanned for the file index `entry`
+    below `root` has been modified since.
+    Adding, removing, or renaming an entry updates the modification time of the
+    parent directory, so only the directories have to be checked.
+    """
+    dirs = [os.path.join(root, d) for d in entry["dirs"]]
+    # stat calls are I/O bound, so threads are sufficient
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        mtimes = pool.map(directory_mtime, dirs)
+        return all(m == stored for m, stored in zip(mtimes, entry["dirs"].values()))
 
 
 @app.command()
@@ -645,6 +1803,21 @@ def bigearthnet(
     bigearthnet_s2_dir: DatasetDir = None,
     bigearthnet_reference_maps_dir: DatasetDir = None,
     num_workers: Annotated[int, typer.Option(min=1)] = None,
+    resume: Resume = False,
+    update: Update = False,
+    compression: Compression = None,
+    zstd_dictionary_samples: ZstdDictionarySamples = None,
+    num_shards: NumShards = 1,
+    part: Part = None,
+    gdal_config: GdalConfig = None,
+    layout: Layout = None,
+    statistics: Statistics = False,
+    compact: Compact = False,
+    file_index: FileIndex = True,
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
+    resample: Resample = None,
+    bands: Bands = None,
 ):
     """
     [BigEarthNet-S1, BigEarthNet-S2, and BigEarthNet-Reference-Maps](https://doi.org/10.5281/zenodo.10891137) converter.
@@ -658,6 +1831,11 @@ def bigearthnet(
 
     NOTE: `num_workers` defaults to number of available threads.
     """
+    compression_config = parse_compression(compression)
+    part_config = parse_part(part)
+    gdal_options = parse_gdal_config("bigearthnet", gdal_config)
+    layout_config = parse_layout(layout)
+    resample_config = parse_resample(resample)
     log.debug("Will first collect all files and ensure that some patches are found.")
     if (
         (bigearthnet_s1_dir is None)
@@ -667,70 +1845,126 @@ def bigearthnet(
         log.error("Please provide at least one directory path")
         exit(-1, "No source directory is specified")
 
-    if bigearthnet_s1_dir is not None:
-        log.info(f"Searching for patches in: {bigearthnet_s1_dir}")
-        s1_patch_paths = fast_find(
-            r"S1[AB]_IW_GRDH_.*_\d+_\d+$", bigearthnet_s1_dir, only_dir=True
-        )
-        num_s1_patch_paths = len(s1_patch_paths)
-        log.debug(f"Found {num_s1_patch_paths} S1 patches.")
-        assert num_s1_patch_paths > 0
-
-    if bigearthnet_s2_dir is not None:
-        log.info(f"Searching for patches in: {bigearthnet_s2_dir}")
-        s2_patch_paths = fast_find(
-            r"S2[AB]_MSIL2A_.*_\d+_\d+$", bigearthnet_s2_dir, only_dir=True
-        )
-        # contains the paths
-        num_s2_patch_paths = len(s2_patch_paths)
-        log.debug(f"Found {num_s2_patch_paths} S2 patches.")
-        assert num_s2_patch_paths > 0
-
-    if bigearthnet_reference_maps_dir is not None:
-        log.info(f"Searching for reference maps in: {bigearthnet_reference_maps_dir}")
-        reference_maps_paths = fast_find(
-            r"S2[AB]_MSIL2A_.*_\d+_\d+_reference_map.tif$",
-            bigearthnet_reference_maps_dir,
-            only_dir=False,
-        )
-        # contains the paths
-        num_reference_maps_paths = len(reference_maps_paths)
-        log.debug(f"Found {num_reference_maps_paths} reference maps.")
-        assert num_reference_maps_paths > 0
-
-    # postpone writing until AFTER both dataset files have been assembled.
-    # Otherwise an error in the latter CLI argument could produce an incomplete LMDB
-    env = open_lmdb(target_dir)
-
-    if bigearthnet_s1_dir is not None:
-        log.debug("Writing BigEarthNet-S1 data into LMDB")
-        lmdb_writer(
-            env,
-            s1_patch_paths,
-            encode_stem,
-            bigearthnet_s1_to_safetensor,
-            max_workers=num_workers,
-        )
-
-    if bigearthnet_s2_dir is not None:
-        log.debug("Writing BigEarthNet-S2 data into LMDB")
-        lmdb_writer(
-            env,
-            s2_patch_paths,
-            encode_stem,
-            bigearthnet_s2_to_safetensor,
-            max_workers=num_workers,
-        )
-
-    if bigearthnet_reference_maps_dir is not None:
-        log.debug("Writing Reference Maps data into LMDB")
-        lmdb_writer(
-            env,
-            reference_maps_paths,
-            encode_stem,
-            bigearthnet_reference_map_to_safetensor,
-            max_workers=num_workers,
-        )
+    # the reference maps only have a single band and are always encoded
+    selected_bands = select_bands(
+        bands,
+        {
+            name: ordering
+            for name, ordering, source_dir in [
+                ("BigEarthNet-S1", BIGEARTHNET_S1_ORDERING, bigearthnet_s1_dir),
+                ("BigEarthNet-S2", BIGEARTHNET_S2_ORDERING, bigearthnet_s2_dir),
+            ]
+            if source_dir is not None
+        },
+    )
+    # the sensors without any of the selected bands are skipped
+    if "BigEarthNet-S1" not in selected_bands:
+        bigearthnet_s1_dir = None
+    if "BigEarthNet-S2" not in selected_bands:
+        bigearthnet_s2_dir = None
+
+    envs = open_lmdb_shards(target_dir, num_shards)
+    # The sub-datasets are discovered in background threads, but every sub-dataset
+    # is only encoded once its own listing is complete, as the keys are inserted in sorted order.
+    with ThreadPoolExecutor() as discovery:
+        if bigearthnet_s1_dir is not None:
+            s1_patch_paths = discovery.submit(
+                find_patches,
+                "S1",
+                r"S1[AB]_IW_GRDH_.*_\d+_\d+$",
+                bigearthnet_s1_dir,
+                only_dir=True,
+                index_dir=target_dir if file_index else None,
+            )
+
+        if bigearthnet_s2_dir is not None:
+            s2_patch_paths = discovery.submit(
+                find_patches,
+                "S2",
+                r"S2[AB]_MSIL2A_.*_\d+_\d+$",
+                bigearthnet_s2_dir,
+                only_dir=True,
+                index_dir=target_dir if file_index else None,
+            )
+
+        if bigearthnet_reference_maps_dir is not None:
+            reference_maps_paths = discovery.submit(
+                find_patches,
+                "reference map",
+                r"S2[AB]_MSIL2A_.*_\d+_\d+_reference_map.tif$",
+                bigearthnet_reference_maps_dir,
+                only_dir=False,
+                index_dir=target_dir if file_index else None,
+            )
+
+        if bigearthnet_s1_dir is not None:
+            log.debug("Writing BigEarthNet-S1 data into LMDB")
+            lmdb_writer(
+                envs,
+                s1_patch_paths.result(),
+                encode_stem,
+                partial(
+                    bigearthnet_s1_to_safetensor,
+                    bands=selected_bands["BigEarthNet-S1"],
+                    layout=layout_config,
+                ),
+                max_workers=num_workers,
+                resume=resume,
+                update=update,
+                compression=compression_config,
+                zstd_dictionary_samples=zstd_dictionary_samples,
+                part=part_config,
+                gdal_options=gdal_options,
+                statistics=statistics,
+                compact=compact,
+                commit_records=commit_records,
+                commit_bytes=commit_bytes,
+            )
+
+        if bigearthnet_s2_dir is not None:
+            log.debug("Writing BigEarthNet-S2 data into LMDB")
+            lmdb_writer(
+                envs,
+                s2_patch_paths.result(),
+                encode_stem,
+                partial(
+                    bigearthnet_s2_to_safetensor,
+                    bands=selected_bands["BigEarthNet-S2"],
+                    layout=layout_config,
+                    resample=resample_config,
+                ),
+                max_workers=num_workers,
+                resume=resume,
+                update=update,
+                compression=compression_config,
+                zstd_dictionary_samples=zstd_dictionary_samples,
+                part=part_config,
+                gdal_options=gdal_options,
+                statistics=statistics,
+                compact=compact,
+                commit_records=commit_records,
+                commit_bytes=commit_bytes,
+            )
+
+        if bigearthnet_reference_maps_dir is not None:
+            log.debug("Writing Reference Maps data into LMDB")
+            lmdb_writer(
+                envs,
+                reference_maps_paths.result(),
+                encode_stem,
+                bigearthnet_reference_map_to_safetensor,
+                max_workers=num_workers,
+                resume=resume,
+                update=update,
+                compression=compression_config,
+                zstd_dictionary_samples=zstd_dictionary_samples,
+                part=part_config,
+                gdal_options=gdal_options,
+                statistics=statistics,
+                compact=compact,
+                commit_records=commit_records,
+                commit_bytes=commit_bytes,
+            )
 
 
 @app.command()
@@ -739,6 +1973,21 @@ def major_tom_core(
     s1_dir: DatasetDir = None,
     s2_dir: DatasetDir = None,
     num_workers: Annotated[int, typer.Option(min=1)] = None,
+    resume: Resume = False,
+    update: Update = False,
+    compression: Compression = None,
+    zstd_dictionary_samples: ZstdDictionarySamples = None,
+    num_shards: NumShards = 1,
+    part: Part = None,
+    gdal_config: GdalConfig = None,
+    layout: Layout = None,
+    statistics: Statistics = False,
+    compact: Compact = False,
+    file_index: FileIndex = True,
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
+    resample: Resample = None,
+    bands: Bands = None,
 ):
     """
     [Major TOM Core S1 & S2](https://github.com/ESA-PhiLab/Major-TOM/tree/main) converter.
@@ -752,49 +2001,105 @@ def major_tom_core(
     NOTE: The `cloud_mask` is NOT encoded in the safetensor.
     NOTE: `num_workers` defaults to number of available threads.
     """
+    compression_config = parse_compression(compression)
+    part_config = parse_part(part)
+    gdal_options = parse_gdal_config("major_tom_core", gdal_config)
+    layout_config = parse_layout(layout)
+    resample_config = parse_resample(resample)
     log.debug("Will first collect all files and ensure that some patches are found.")
     if (s1_dir is None) and (s2_dir is None):
         log.error("Please provide at least one directory path")
         exit(-1, "No source directory is specified")
 
-    if s1_dir is not None:
-        log.info(f"Searching for patches in: {s1_dir}")
-        s1_patch_paths = fast_find(r"S1[AB]_IW_GRDH_.*_rtc$", s1_dir, only_dir=True)
-        num_s1_patch_paths = len(s1_patch_paths)
-        log.debug(f"Found {num_s1_patch_paths} S1 patches.")
-        assert num_s1_patch_paths > 0
-
-    if s2_dir is not None:
-        log.info(f"Seaching for patches in: {s2_dir}")
-        s2_patch_paths = fast_find(r"S2[AB]_MSIL2A_.*_[0-9T]+$", s2_dir, only_dir=True)
-        # contains the paths
-        num_s2_patch_paths = len(s2_patch_paths)
-        log.debug(f"Found {num_s2_patch_paths} S2 patches.")
-        assert num_s2_patch_paths > 0
-
-    # postpone writing until AFTER both dataset files have been assembled.
-    # Otherwise an error in the latter CLI argument could produce an incomplete LMDB
-    env = open_lmdb(target_dir)
-
-    if s1_dir is not None:
-        log.debug("Writing Major TOM Core S1 data into LMDB")
-        lmdb_writer(
-            env,
-            s1_patch_paths,
-            encode_with_parent,
-            major_tom_core_s1_to_safetensor,
-            max_workers=num_workers,
-        )
-
-    if s2_dir is not None:
-        log.debug("Writing Major TOM Core data into LMDB")
-        lmdb_writer(
-            env,
-            s2_patch_paths,
-            encode_with_parent,
-            major_tom_core_s2_to_safetensor,
-            max_workers=num_workers,
-        )
+    selected_bands = select_bands(
+        bands,
+        {
+            name: ordering
+            for name, ordering, source_dir in [
+                ("Major-TOM-Core-S1", MAJOR_TOM_S1_ORDERING, s1_dir),
+                ("Major-TOM-Core-S2", MAJOR_TOM_S2_ORDERING, s2_dir),
+            ]
+            if source_dir is not None
+        },
+    )
+    # the sensors without any of the selected bands are skipped
+    if "Major-TOM-Core-S1" not in selected_bands:
+        s1_dir = None
+    if "Major-TOM-Core-S2" not in selected_bands:
+        s2_dir = None
+
+    envs = open_lmdb_shards(target_dir, num_shards)
+    # The sub-datasets are discovered in background threads, but every sub-dataset
+    # is only encoded once its own listing is complete, as the keys are inserted in sorted order.
+    with ThreadPoolExecutor() as discovery:
+        if s1_dir is not None:
+            s1_patch_paths = discovery.submit(
+                find_patches,
+                "S1",
+                r"S1[AB]_IW_GRDH_.*_rtc$",
+                s1_dir,
+                only_dir=True,
+                index_dir=target_dir if file_index else None,
+            )
+
+        if s2_dir is not None:
+            s2_patch_paths = discovery.submit(
+                find_patches,
+                "S2",
+                r"S2[AB]_MSIL2A_.*_[0-9T]+$",
+                s2_dir,
+                only_dir=True,
+                index_dir=target_dir if file_index else None,
+            )
+
+        if s1_dir is not None:
+            log.debug("Writing Major TOM Core S1 data into LMDB")
+            lmdb_writer(
+                envs,
+                s1_patch_paths.result(),
+                encode_with_parent,
+                partial(
+                    major_tom_core_s1_to_safetensor,
+                    bands=selected_bands["Major-TOM-Core-S1"],
+                    layout=layout_config,
+                ),
+                max_workers=num_workers,
+                resume=resume,
+                update=update,
+                compression=compression_config,
+                zstd_dictionary_samples=zstd_dictionary_samples,
+                part=part_config,
+                gdal_options=gdal_options,
+                statistics=statistics,
+                compact=compact,
+                commit_records=commit_records,
+                commit_bytes=commit_bytes,
+            )
+
+        if s2_dir is not None:
+            log.debug("Writing Major TOM Core data into LMDB")
+            lmdb_writer(
+                envs,
+                s2_patch_paths.result(),
+                encode_with_parent,
+                partial(
+                    major_tom_core_s2_to_safetensor,
+                    bands=selected_bands["Major-TOM-Core-S2"],
+                    layout=layout_config,
+                    resample=resample_config,
+                ),
+                max_workers=num_workers,
+                resume=resume,
+                update=update,
+                compression=compression_config,
+                zstd_dictionary_samples=zstd_dictionary_samples,
+                part=part_config,
+                gdal_options=gdal_options,
+                statistics=statistics,
+                compact=compact,
+                commit_records=commit_records,
+                commit_bytes=commit_bytes,
+            )
 
 
 @app.command()
@@ -804,6 +2109,20 @@ def ssl4eo_s12(
     s2_l1c_dir: DatasetDir = None,
     s2_l2a_dir: DatasetDir = None,
     num_workers: Annotated[int, typer.Option(min=1)] = None,
+    resume: Resume = False,
+    update: Update = False,
+    compression: Compression = None,
+    zstd_dictionary_samples: ZstdDictionarySamples = None,
+    num_shards: NumShards = 1,
+    part: Part = None,
+    gdal_config: GdalConfig = None,
+    layout: Layout = None,
+    statistics: Statistics = False,
+    compact: Compact = False,
+    file_index: FileIndex = True,
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
+    bands: Bands = None,
 ):
     """
     [SSL4EO-S12 Sentinel-1, Sentinel-2 L1C, and Sentinel-2 L2A](https://github.com/zhu-xlab/SSL4EO_S12-S12) converter.
@@ -837,83 +2156,650 @@ def ssl4eo_s12(
     To unpack the data simply run `cat s1*.tar.gz | tar -xzf -`
     NOTE: `num_workers` defaults to number of available threads.
     """
+    compression_config = parse_compression(compression)
+    part_config = parse_part(part)
+    gdal_options = parse_gdal_config("ssl4eo_s12", gdal_config)
+    layout_config = parse_layout(layout)
     log.debug("Will first collect all files and ensure that some patches are found.")
 
     if (s1_dir is None) and (s2_l1c_dir is None) and (s2_l2a_dir is None):
         log.error("Please provide at least one directory path")
         exit(-1, "No source directory is specified")
 
-    if s1_dir is not None:
-        log.info(f"Searching for patches in: {s1_dir}")
-        # use fastest matching logic; will fail if directory has been touched or changed
-        s1_patch_paths = fast_find(".", s1_dir, only_dir=True, exact_depth=2)
-        num_s1_patch_paths = len(s1_patch_paths)
-        log.debug(f"Found {num_s1_patch_paths} S1 patches.")
-        assert num_s1_patch_paths > 0
-
-    if s2_l1c_dir is not None:
-        log.info(f"Seaching for patches in: {s2_l1c_dir}")
-        s2_l1c_patch_paths = fast_find(".", s2_l1c_dir, only_dir=True, exact_depth=2)
-        # use fastest matching logic; will fail if directory has been touched or changed
-        num_s2_l1c_patch_paths = len(s2_l1c_patch_paths)
-        log.debug(f"Found {num_s2_l1c_patch_paths} S2 L1C patches.")
-        assert num_s2_l1c_patch_paths > 0
-
-    if s2_l2a_dir is not None:
-        log.info(f"Seaching for patches in: {s2_l2a_dir}")
-        s2_l2a_patch_paths = fast_find(".", s2_l2a_dir, only_dir=True, exact_depth=2)
-        # use fastest matching logic; will fail if directory has been touched or changed
-        num_s2_l2a_patch_paths = len(s2_l2a_patch_paths)
-        log.debug(f"Found {num_s2_l2a_patch_paths} S2 L2A patches.")
-        assert num_s2_l2a_patch_paths > 0
-
-    # postpone writing until AFTER both dataset files have been assembled.
-    # Otherwise an error in the latter CLI argument could produce an incomplete LMDB
-    env = open_lmdb(target_dir)
-
-    # Above we are matching all directories that are two levels deep relative to
-    # the given base directory. As the s2-l2a and s2-l1c sub-paths are identical
-    # for a given tile, we need to embed the base directory name `s2c` and `s2a`
-    # to allow writing a single LMDB file.
-    # For consistency, we do the same for the S1 data
-    if s1_dir is not None:
-        log.debug("Writing SSL4EO-S12-S1 data into LMDB")
-        lmdb_writer(
-            env,
-            s1_patch_paths,
-            encode_three_levels,
-            ssl4eo_s1_to_safetensor,
-            max_workers=num_workers,
+    selected_bands = select_bands(
+        bands,
+        {
+            name: ordering
+            for name, ordering, source_dir in [
+                ("SSL4EO-S12-S1", SSL4EO_S12_S1_ORDERING, s1_dir),
+                ("SSL4EO-S12-S2-L1C", SSL4EO_S12_S2_L1C_ORDERING, s2_l1c_dir),
+                ("SSL4EO-S12-S2-L2A", SSL4EO_S12_S2_L2A_ORDERING, s2_l2a_dir),
+            ]
+            if source_dir is not None
+        },
+    )
+    # the sensors without any of the selected bands are skipped
+    if "SSL4EO-S12-S1" not in selected_bands:
+        s1_dir = None
+    if "SSL4EO-S12-S2-L1C" not in selected_bands:
+        s2_l1c_dir = None
+    if "SSL4EO-S12-S2-L2A" not in selected_bands:
+        s2_l2a_dir = None
+
+    envs = open_lmdb_shards(target_dir, num_shards)
+    # The sub-datasets are discovered in background threads, but every sub-dataset
+    # is only encoded once its own listing is complete, as the keys are inserted in sorted order.
+    # Use the fastest matching logic for all sub-datasets;
+    # will fail if directory has been touched or changed
+    with ThreadPoolExecutor() as discovery:
+        if s1_dir is not None:
+            s1_patch_paths = discovery.submit(
+                find_patches,
+                "S1",
+                ".",
+                s1_dir,
+                only_dir=True,
+                exact_depth=2,
+                index_dir=target_dir if file_index else None,
+            )
+
+        if s2_l1c_dir is not None:
+            s2_l1c_patch_paths = discovery.submit(
+                find_patches,
+                "S2 L1C",
+                ".",
+                s2_l1c_dir,
+                only_dir=True,
+                exact_depth=2,
+                index_dir=target_dir if file_index else None,
+            )
+
+        if s2_l2a_dir is not None:
+            s2_l2a_patch_paths = discovery.submit(
+                find_patches,
+                "S2 L2A",
+                ".",
+                s2_l2a_dir,
+                only_dir=True,
+                exact_depth=2,
+                index_dir=target_dir if file_index else None,
+            )
+
+        # Above we are matching all directories that are two levels deep relative to
+        # the given base directory. As the s2-l2a and s2-l1c sub-paths are identical
+        # for a given tile, we need to embed the base directory name `s2c` and `s2a`
+        # to allow writing a single LMDB file.
+        # For consistency, we do the same for the S1 data
+        if s1_dir is not None:
+            log.debug("Writing SSL4EO-S12-S1 data into LMDB")
+            lmdb_writer(
+                envs,
+                s1_patch_paths.result(),
+                encode_three_levels,
+                partial(
+                    ssl4eo_s1_to_safetensor,
+                    bands=selected_bands["SSL4EO-S12-S1"],
+                    layout=layout_config,
+                ),
+                max_workers=num_workers,
+                resume=resume,
+                update=update,
+                compression=compression_config,
+                zstd_dictionary_samples=zstd_dictionary_samples,
+                part=part_config,
+                gdal_options=gdal_options,
+                statistics=statistics,
+                compact=compact,
+                commit_records=commit_records,
+                commit_bytes=commit_bytes,
+            )
+
+        if s2_l1c_dir is not None:
+            log.debug("Writing SSL4EO-S12-S2 L1C data into LMDB")
+            lmdb_writer(
+                envs,
+                s2_l1c_patch_paths.result(),
+                encode_three_levels,
+                partial(
+                    ssl4eo_s2_l1c_to_safetensor,
+                    bands=selected_bands["SSL4EO-S12-S2-L1C"],
+                    layout=layout_config,
+                ),
+                max_workers=num_workers,
+                resume=resume,
+                update=update,
+                compression=compression_config,
+                zstd_dictionary_samples=zstd_dictionary_samples,
+                part=part_config,
+                gdal_options=gdal_options,
+                statistics=statistics,
+                compact=compact,
+                commit_records=commit_records,
+                commit_bytes=commit_bytes,
+            )
+
+        if s2_l2a_dir is not None:
+            log.debug("Writing SSL4EO-S12-S2 L2A data into LMDB")
+            lmdb_writer(
+                envs,
+                s2_l2a_patch_paths.result(),
+                encode_three_levels,
+                partial(
+                    ssl4eo_s2_l2a_to_safetensor,
+                    bands=selected_bands["SSL4EO-S12-S2-L2A"],
+                    layout=layout_config,
+                ),
+                max_workers=num_workers,
+                resume=resume,
+                update=update,
+                compression=compression_config,
+                zstd_dictionary_samples=zstd_dictionary_samples,
+                part=part_config,
+                gdal_options=gdal_options,
+                statistics=statistics,
+                compact=compact,
+                commit_records=commit_records,
+                commit_bytes=commit_bytes,
+            )
+
+
+@app.command()
+def merge(
+    target_dir: TargetDir,
+    part_dirs: Annotated[
+        list[Path],
+        typer.Argument(
+            exists=True,
+            file_okay=False,
+            dir_okay=True,
+            readable=True,
+            resolve_path=True,
+        ),
+    ],
+    commit_records: CommitRecords = DEFAULT_COMMIT_RECORDS,
+    commit_bytes: CommitBytes = DEFAULT_COMMIT_BYTES,
+):
+    """
+    Merge the parts of a conversion that was split across multiple nodes with `--part`.
+
+    All parts `0/N` to `N-1/N` have to be given. The records are inserted in the
+    same order and with the same transactions as in a single run, so the merged
+    LMDB database is identical to a conversion without `--part` with the same
+    `--commit-records` and `--commit-bytes`.
+    If the parts are sharded, the merged conversion has the same number of shards.
+    """
+    shards_manifests = [read_shards_manifest(part_dir) for part_dir in part_dirs]
+    num_shards = {m["num_shards"] if m is not None else 1 for m in shards_manifests}
+    if len(num_shards) != 1:
+        sys.exit("All parts have to be written with the same `--num-shards`")
+    envs = open_lmdb_shards(target_dir, num_shards.pop())
+    log.debug(f"Merging {len(part_dirs)} parts into LMDB")
+    lmdb_merger(
+        envs, part_dirs, commit_records=commit_records, commit_bytes=commit_bytes
+    )
+
+
+class SharedMemoryRecord(NamedTuple):
+    """
+    Reference to a serialized record inside of a named shared memory segment.
+    """
+
+    name: str
+    size: int
+
+
+def encode_record(
+    safetensor_generator,
+    encoders: list,
+    min_bytes: int,
+    collect_statistics: bool,
+    path: str,
+) -> tuple[Union[bytes, SharedMemoryRecord], Optional[dict]]:
+    """
+    Call the `safetensor_generator` on the `path` and apply the `encoders`
+    (for example, the compression) in order to the serialized record.
+    Returns the record (see `encode_to_shared_memory`) together with the
+    `band_statistics` of the unencoded record if `collect_statistics` is set.
+    """
+    value = safetensor_generator(path)
+    statistics = band_statistics(value) if collect_statistics else None
+    try:
+        for encoder in encoders:
+            value = encoder(value)
+    except CompactSchemaError:
+        # the parent process reports the key of the record
+        raise CompactSchemaError(path) from None
+    return encode_to_shared_memory(value, min_bytes), statistics
+
+
+def encode_to_shared_memory(
+    value: bytes, min_bytes: int
+) -> Union[bytes, SharedMemoryRecord]:
+    """
+    Copy the serialized record `value` into a new shared memory segment
+    if it has at least `min_bytes` bytes.
+    Only the small `SharedMemoryRecord` reference is sent back to the parent process,
+    which avoids pickling and piping the record.
+    The receiver is responsible for unlinking the segment via `shared_memory_value`.
+    """
+    if len(value) < min_bytes:
+        return value
+    shm = shared_memory.SharedMemory(create=True, size=len(value))
+    shm.buf[: len(value)] = value
+    record = SharedMemoryRecord(shm.name, len(value))
+    shm.close()
+    return record
+
+
+def discard_encoded_record(
+    result: tuple[Union[bytes, SharedMemoryRecord], Optional[dict]],
+):
+    """
+    Release the shared memory of an `encode_record` result that is not written.
+    """
+    value, _ = result
+    with shared_memory_value(value):
+        pass
+
+
+@contextmanager
+def shared_memory_copy(value: bytes):
+    """
+    Copy the `value` into a new shared memory segment and provide its
+    `SharedMemoryRecord`. The segment is unlinked after leaving the context.
+    """
+    shm = shared_memory.SharedMemory(create=True, size=len(value))
+    shm.buf[: len(value)] = value
+    try:
+        yield SharedMemoryRecord(shm.name, len(value))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+@contextmanager
+def shared_memory_value(value: Union[bytes, SharedMemoryRecord]):
+    """
+    Provide the serialized record as a buffer without copying the data.
+    If the record is stored in shared memory, the segment is
+    released and unlinked after leaving the context.
+    """
+    if not isinstance(value, SharedMemoryRecord):
+        yield value
+        return
+    shm = shared_memory.SharedMemory(name=value.name)
+    view = shm.buf[: value.size]
+    try:
+        yield view
+    finally:
+        view.release()
+        shm.close()
+        shm.unlink()
+
+
+def init_worker(gdal_options: dict[str, str]):
+    """
+    Prepare a worker process of the `worker_pool` once, before the first patch is encoded.
+    Unpickling this function already imports this module together with `rasterio`,
+    GDAL, `numpy`, and `safetensors`.
+    The GDAL environment with the `gdal_options` is activated for the lifetime
+    of the process, so that `rasterio.open` does not set up a new environment for every file.
+    """
+    global _GDAL_ENV
+    # Datasets like UC Merced and Hydro are not georeferenced
+    warnings.filterwarnings("ignore", category=NotGeoreferencedWarning)
+    _GDAL_ENV = rasterio.Env(**gdal_options)
+    _GDAL_ENV.__enter__()
+
+
+def worker_pool(
+    max_workers: Optional[int] = None, gdal_options: Optional[dict[str, str]] = None
+) -> ProcessPoolExecutor:
+    """
+    Return the process pool that encodes the records of `lmdb_writer`.
+    The pool is created once and shared by all `lmdb_writer` calls of the process,
+    so that the worker processes are only started and initialized once
+    (see `init_worker`).
+    Will default to using `os.cpu_count()` number of workers and
+    the `DEFAULT_GDAL_OPTIONS`.
+    """
+    global _WORKER_POOL
+    if gdal_options is None:
+        gdal_options = DEFAULT_GDAL_OPTIONS
+    config = (max_workers or os.cpu_count(), gdal_options)
+    if _WORKER_POOL is not None and _WORKER_POOL[0] != config:
+        shutdown_worker_pool()
+    if _WORKER_POOL is None:
+        # Use `spawn` as this is POSIX compliant and will be the default in the future:
+        # https://docs.python.org/3/library/multiprocessing.html#contexts-and-start-methods
+        executor = ProcessPoolExecutor(
+            max_workers=config[0],
+            mp_context=mp.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(gdal_options,),
         )
+        _WORKER_POOL = (config, executor)
+    return _WORKER_POOL[1]
+
+
+def shutdown_worker_pool():
+    """
+    Shut down the shared `worker_pool` if it has been created.
+    """
+    global _WORKER_POOL
+    if _WORKER_POOL is not None:
+        _WORKER_POOL[1].shutdown()
+        _WORKER_POOL = None
+
+
+def ordered_results(executor, fn, items, max_in_flight: int, discard=None):
+    """
+    Submit `fn(item)` for each of the `items` to the `executor` and
+    yield the `(item, result)` tuples in submission order.
+    At most `max_in_flight` futures are pending at any time, and a new task is
+    submitted as soon as the oldest result has been collected.
+    This keeps all workers busy without having to wait until a fixed-size
+    chunk of tasks has completed.
+
+    If the generator is closed early or a task fails, the pending tasks are cancelled
+    and `discard(result)` is called for the results of the tasks that already started,
+    so that they can release their resources.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            if len(pending) >= max_in_flight:
+                done_item, future = pending.popleft()
+                yield done_item, future.result()
+            pending.append((item, executor.submit(fn, item)))
+        while pending:
+            done_item, future = pending.popleft()
+            yield done_item, future.result()
+    finally:
+        for _, future in pending:
+            if future.cancel() or discard is None:
+                continue
+            try:
+                result = future.result()
+            except Exception:
+                continue
+            discard(result)
+
+
+def read_journal(target_dir: Path) -> dict:
+    """
+    Read the progress journal from the LMDB `target_dir`.
+    Returns an empty dictionary if no journal exists.
+    """
+    journal_path = Path(target_dir).joinpath(JOURNAL_FILE_NAME)
+    if not journal_path.exists():
+        return {}
+    return json.loads(journal_path.read_text())
+
+
+def write_journal_entry(target_dir: Path, name: str, entry: dict):
+    """
+    Update the progress journal entry `name` inside of the LMDB `target_dir`.
+    The journal is replaced atomically, so that a crash never leaves a
+    partially written journal behind.
+    """
+    journal = read_journal(target_dir)
+    journal[name] = entry
+    journal_path = Path(target_dir).joinpath(JOURNAL_FILE_NAME)
+    tmp_path = journal_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(journal, indent=2))
+    os.replace(tmp_path, journal_path)
 
-    if s2_l1c_dir is not None:
-        log.debug("Writing SSL4EO-S12-S2 L1C data into LMDB")
-        lmdb_writer(
-            env,
-            s2_l1c_patch_paths,
-            encode_three_levels,
-            ssl4eo_s2_l1c_to_safetensor,
-            max_workers=num_workers,
+
+def read_part_manifest(target_dir: Path) -> Optional[dict]:
+    """
+    Read the part manifest from the LMDB `target_dir`.
+    Returns `None` if the conversion was not split with `--part`.
+    """
+    manifest_path = Path(target_dir).joinpath(PART_MANIFEST_FILE_NAME)
+    if not manifest_path.exists():
+        return None
+    return json.loads(manifest_path.read_text())
+
+
+def write_part_entry(target_dir: Path, part: PartConfig, name: str, entry: dict):
+    """
+    Update the entry `name` of the part manifest inside of the LMDB `target_dir`.
+    The manifest is replaced atomically.
+
+    Exits the program if `target_dir` already contains a different part.
+    """
+    manifest = read_part_manifest(target_dir) or {**part._asdict(), "datasets": {}}
+    if (manifest["index"], manifest["num_parts"]) != tuple(part):
+        sys.exit(
+            f"{target_dir} already contains the part {manifest['index']}/{manifest['num_parts']}"
         )
+    manifest["datasets"][name] = entry
+    manifest_path = Path(target_dir).joinpath(PART_MANIFEST_FILE_NAME)
+    tmp_path = manifest_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest))
+    os.replace(tmp_path, manifest_path)
+
+
+def existing_lmdb_keys(envs) -> set[bytes]:
+    """
+    Return the set of all keys that are already committed to the LMDB shards `envs`.
+    Only the keys are read, the values are not accessed.
+    """
+    keys = set()
+    for env in envs:
+        with env.begin(write=False) as txn:
+            keys.update(txn.cursor().iternext(values=False))
+    return keys
+
+
+# The public names of the sub-datasets (the keys of `BAND_ORDERINGS`) that are used
+# in the statistics and the key index instead of the names of the safetensor generators
+SUB_DATASET_NAMES = {
+    "bigearthnet_s1_to_safetensor": "bigearthnet-s1",
+    "bigearthnet_s2_to_safetensor": "bigearthnet-s2",
+    "bigearthnet_reference_map_to_safetensor": "bigearthnet-reference-maps",
+    "major_tom_core_s1_to_safetensor": "major-tom-core-s1",
+    "major_tom_core_s2_to_safetensor": "major-tom-core-s2",
+    "ssl4eo_s1_to_safetensor": "ssl4eo-s12-s1",
+    "ssl4eo_s2_l1c_to_safetensor": "ssl4eo-s12-s2-l1c",
+    "ssl4eo_s2_l2a_to_safetensor": "ssl4eo-s12-s2-l2a",
+    "hyspecnet_to_safetensor": "hyspecnet-11k",
+    "spectral_earth_to_safetensor": "spectral-earth-enmap",
+    "eurosat_ms_to_safetensor": "eurosat-multi-spectral",
+    "hydro_to_safetensor": "hydro",
+    "uc_merced_to_safetensor": "uc-merced",
+}
+
 
-    if s2_l2a_dir is not None:
-        log.debug("Writing SSL4EO-S12-S2 L2A data into LMDB")
-        lmdb_writer(
-            env,
-            s2_l2a_patch_paths,
-            encode_three_levels,
-            ssl4eo_s2_l2a_to_safetensor,
-            max_workers=num_workers,
+def sub_dataset_name(journal_name: str) -> str:
+    """
+    Return the public name of the sub-dataset that is identified by the
+    `journal_name` (see `describe_generator`) inside of the journal.
+    """
+    return SUB_DATASET_NAMES.get(journal_name, journal_name)
+
+
+def describe_generator(safetensor_generator) -> tuple[str, bytes]:
+    """
+    Return the name of the (possibly `functools.partial` wrapped) `safetensor_generator`
+    and its serialized encoding options.
+    Options that are `None` use the default encoding and are skipped.
+    """
+    if not isinstance(safetensor_generator, partial):
+        return safetensor_generator.__name__, b""
+    options = {k: v for k, v in safetensor_generator.keywords.items() if v is not None}
+    return (
+        safetensor_generator.func.__name__,
+        json.dumps(options, sort_keys=True).encode() if options else b"",
+    )
+
+
+def source_fingerprint(path: str, encoding_options: bytes = b"") -> bytes:
+    """
+    Compute a cheap fingerprint of the source `path` from the name, size, and
+    modification time of the file.
+    If `path` is a patch directory, the fingerprint covers all files inside
+    of the directory.
+    The `encoding_options` are included, so that changing them invalidates the fingerprint.
+    """
+    p = Path(path)
+    if p.is_dir():
+        stats = [(entry.name, entry.stat()) for entry in os.scandir(p)]
+    else:
+        stats = [(p.name, p.stat())]
+    h = hashlib.sha256(encoding_options)
+    for name, stat in sorted(stats, key=lambda e: e[0]):
+        h.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return h.hexdigest().encode()
+
+
+def plan_update(
+    envs,
+    paths,
+    lmdb_key_extractor_func,
+    name: str,
+    encoding_options: bytes = b"",
+    max_workers=None,
+):
+    """
+    Compare the source fingerprints of the `paths` with the ones stored in
+    the fingerprints databases of the LMDB shards `envs`.
+    The fingerprints are tagged with the sub-dataset `name`, to only consider
+    keys that were written by the same converter.
+    The `encoding_options` are part of the fingerprint, so that all paths are
+    re-encoded if the options change.
+
+    Returns the paths that have to be (re-)encoded, a mapping from these paths
+    to their new fingerprint value, and the keys whose source disappeared.
+    """
+    # stat calls are I/O bound, so threads are sufficient
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        fingerprints = list(
+            pool.map(
+                partial(source_fingerprint, encoding_options=encoding_options), paths
+            )
         )
+    tag = f"{name}:".encode()
+    stored = {}
+    for env in envs:
+        fingerprint_db = env.open_db(FINGERPRINTS_DB_NAME)
+        with env.begin(write=False) as txn:
+            stored.update(
+                (k, v) for k, v in txn.cursor(db=fingerprint_db) if v.startswith(tag)
+            )
+
+    changed_paths = []
+    new_fingerprints = {}
+    current_keys = set()
+    for p, fingerprint in zip(paths, fingerprints):
+        key = lmdb_key_extractor_func(p)
+        current_keys.add(key)
+        value = tag + fingerprint
+        if stored.get(key) != value:
+            changed_paths.append(p)
+            new_fingerprints[p] = value
+    stale_keys = sorted(set(stored.keys()) - current_keys)
+    return changed_paths, new_fingerprints, stale_keys
+
+
+def lmdb_commit_loop(
+    env,
+    result_queue: queue.Queue,
+    lmdb_key_extractor_func,
+    commit_records: int,
+    commit_bytes: int,
+    failures: list,
+    on_commit=None,
+    fingerprints: Optional[dict] = None,
+):
+    """
+    Consume the `(path, value)` tuples from the `result_queue` until `None` is received
+    and write them into the LMDB `env`.
+    This function owns the single write transaction and commits it as soon as either
+    `commit_records` records or `commit_bytes` bytes have been written.
+    After each commit `on_commit(num_records, last_key)` is called.
+
+    If `fingerprints` are given, existing keys are overwritten and the fingerprint
+    of each path is written into the fingerprints database within the same transaction.
+    Otherwise, if a key already exists, the transaction is aborted, the error message is appended
+    to `failures` and the remaining queue items are discarded.
+    Any other error while writing or committing (e.g., `lmdb.MapFullError`) is handled
+    in the same way, so that the producer never blocks on a dead writer and the
+    caller can check `failures` after joining the thread.
+    """
+    fingerprint_db = (
+        env.open_db(FINGERPRINTS_DB_NAME) if fingerprints is not None else None
+    )
+    overwrite = fingerprints is not None
+    txn = env.begin(write=True)
+    num_records = 0
+    num_bytes = 0
+    last_key = None
+    while (item := result_queue.get()) is not None:
+        p, value = item
+        # the shared memory is always released, even if the records are discarded
+        with shared_memory_value(value) as buffer:
+            if failures:
+                continue
+            try:
+                key = lmdb_key_extractor_func(p)
+                if fingerprint_db is not None:
+                    txn.put(key, fingerprints[p], db=fingerprint_db)
+                if not txn.put(key, buffer, overwrite=overwrite):
+                    failures.append(
+                        f"Program about to overwriting data in the DB: with source {str(p)} Stopping execution!"
+                    )
+                    continue
+                last_key = key
+                num_records += 1
+                num_bytes += len(buffer)
+                if num_records >= commit_records or num_bytes >= commit_bytes:
+                    txn.commit()
+                    if on_commit is not None:
+                        on_commit(num_records, last_key)
+                    txn = env.begin(write=True)
+                    num_records = 0
+                    num_bytes = 0
+            except Exception as e:
+                failures.append(f"Could not write {str(p)} into {env.path()}: {e!r}")
+    if not failures:
+        try:
+            txn.commit()
+        except Exception as e:
+            failures.append(f"Could not commit into {env.path()}: {e!r}")
+        else:
+            if on_commit is not None:
+                on_commit(num_records, last_key)
+    if failures:
+        # a no-op if the transaction already ended
+        txn.abort()
 
 
 def lmdb_writer(
-    env, paths, lmdb_key_extractor_func, safetensor_generator, max_workers=None
+    envs,
+    paths,
+    lmdb_key_extractor_func,
+    safetensor_generator,
+    max_workers=None,
+    max_in_flight=None,
+    commit_records=DEFAULT_COMMIT_RECORDS,
+    commit_bytes=DEFAULT_COMMIT_BYTES,
+    resume=False,
+    update=False,
+    shared_memory_min_bytes=DEFAULT_SHARED_MEMORY_MIN_BYTES,
+    compression: Optional[CompressionConfig] = None,
+    zstd_dictionary_samples: Optional[int] = None,
+    part: Optional[PartConfig] = None,
+    executor: Optional[ProcessPoolExecutor] = None,
+    gdal_options: Optional[dict[str, str]] = None,
+    statistics: bool = False,
+    compact: bool = False,
 ):
     """
     A parallel LMDB writer.
-    It takes an already opened LMDB `env` as an input and writes batched
-    transactions to the DB.
+    It takes the already opened LMDB shards `envs` (see `open_lmdb_shards`) as an input
+    and writes batched transactions to the DB.
     It will iterate in parallel over the paths and will call the
     `lmdb_key_extractor_func` and `safetensor_generator` on each provided `path`.
     The data is inserted in a sorted order to ensure stable and repeatable outputs.
@@ -921,42 +2807,482 @@ def lmdb_writer(
     halts and exists the program with an error message.
 
     The number of parallel writers can be controlled via `max_workers`.
+    The records are encoded by the process pool `executor`, which defaults
+    to the `worker_pool` that is shared by all calls and reads the rasters with
+    the GDAL configuration `gdal_options` (see `parse_gdal_config`).
+    The number of pending tasks is bounded by `max_in_flight`, which defaults to
+    four times the number of workers.
+
+    The ordered results are handed over to a dedicated writer thread per shard
+    that commits the transaction whenever `commit_records` records or
+    `commit_bytes` bytes have been written, whichever comes first.
+    Each key is written to the shard given by `shard_index`.
+    Records with at least `shared_memory_min_bytes` bytes are transferred from the
+    workers to the writer thread via shared memory.
+    The progress of every commit is recorded in the journal next to the LMDB files.
+
+    If `resume` is set, all paths whose keys are already stored in the LMDB are
+    skipped before they are read. The remaining paths are written in the same
+    order as in an uninterrupted run.
+
+    If `update` is set, only paths whose source fingerprint changed since the last
+    `update` run are (re-)encoded and keys whose source disappeared are deleted.
+    The fingerprints are stored in a named database inside of each LMDB shard.
+
+    If `compression` is given, every band is compressed with `compress_safetensor`.
+
+    If `zstd_dictionary_samples` is given, a zstd dictionary is trained from the
+    records of this many evenly spaced paths and every record is compressed with it.
+    The dictionary is stored under a reserved key inside of every LMDB shard.
+    The samples are drawn from all paths, so that a resumed run trains the
+    identical dictionary.
+
+    If `part` is given, only the slice of the sorted paths that belongs to the part
+    is written (see `part_paths`). The keys are recorded in insertion order in the
+    part manifest, so that the parts can be combined with `lmdb_merger`.
+
+    If `statistics` is set, the workers compute the `band_statistics` of every record,
+    which are merged in insertion order and stored under the reserved `statistics_key`
+    of the sub-dataset inside of every LMDB shard.
+    The statistics are skipped if not all paths are encoded in this run.
+
+    If `compact` is set, the shared safetensors header of the sub-dataset is stored once
+    under a reserved key inside of every LMDB shard and the records only store the band data
+    (see `compact_record`).
+    Exits the program if the header of a record differs from the shared header.
     """
     # insertion order is important for reproducibility!
     paths.sort()
-    log.debug("About to serialize data in chunks")
-    # Keep the the individual processes around for as long as possible
-    # to maximize efficiency
-    # Use `spawn` as this is POSIX compliant and will be the default in the future:
-    # https://docs.python.org/3/library/multiprocessing.html#contexts-and-start-methods
-    with ProcessPoolExecutor(
-        max_workers=max_workers, mp_context=mp.get_context("spawn")
-    ) as executor:
-        # chunk size limits the number of writes per transaction
-        # and the maximum number of futures that needs to be processed
-        # FUTURE: tqdm call could be optimized
-        for paths_chunk in tqdm(list(chunked(paths, 512))):
+    # the schema of compact records is taken from the first path of all parts
+    first_path = paths[0] if paths else None
+    num_shards = len(envs)
+    target_dir = Path(envs[0].path())
+    if num_shards > 1:
+        # the journal is shared by all shards
+        target_dir = target_dir.parent
+    # the generator name uniquely identifies the sub-dataset inside of the journal
+    journal_name, encoding_options = describe_generator(safetensor_generator)
+    # applied in order to the serialized records of the `safetensor_generator`
+    encoders = []
+    if compression is not None:
+        encoding_options += json.dumps(compression._asdict()).encode()
+        encoders.append(partial(compress_safetensor, compression=compression))
+    if compact:
+        if compression is not None:
+            sys.exit("`--compact` cannot be combined with `--compression`")
+        encoding_options += json.dumps({"compact": compact}).encode()
+    if zstd_dictionary_samples is not None:
+        if compression is not None:
+            sys.exit("Dictionary compression cannot be combined with `--compression`")
+        encoding_options += json.dumps(
+            {"zstd_dictionary_samples": zstd_dictionary_samples}
+        ).encode()
+        sample_step = max(1, len(paths) // zstd_dictionary_samples)
+        sample_paths = paths[::sample_step][:zstd_dictionary_samples]
+    if part is not None:
+        if update:
+            sys.exit("`--part` cannot be combined with `--update`")
+        # the dictionary samples are drawn from all paths above,
+        # so that every part trains the identical dictionary
+        paths = part_paths(paths, part)
+        part_keys = [lmdb_key_extractor_func(p).decode() for p in paths]
+    # all paths of this (part of the) sub-dataset, including the ones that are skipped
+    index_paths = paths
+    previous_entry = read_journal(target_dir).get(journal_name)
+    if previous_entry is not None and previous_entry["status"] != "complete":
+        log.warning(
+            f"A previous run of {journal_name} did not complete; "
+            f"last committed key: {previous_entry['last_committed_key']}"
+        )
+        if not resume:
+            log.warning("Use `--resume` to continue the previous run.")
+
+    num_skipped = 0
+    last_committed_key = None
+    fingerprints = None
+    if update:
+        num_paths = len(paths)
+        paths, fingerprints, stale_keys = plan_update(
+            envs,
+            paths,
+            lmdb_key_extractor_func,
+            journal_name,
+            encoding_options=encoding_options,
+            max_workers=max_workers,
+        )
+        num_skipped = num_paths - len(paths)
+        log.info(
+            f"Updating: {len(paths)} new or changed patches, "
+            f"{num_skipped} unchanged patches, {len(stale_keys)} removed patches."
+        )
+        for shard, env in enumerate(envs):
+            fingerprint_db = env.open_db(FINGERPRINTS_DB_NAME)
+            with env.begin(write=True) as txn:
+                for key in stale_keys:
+                    if shard_index(key, num_shards) == shard:
+                        txn.delete(key)
+                        txn.delete(key, db=fingerprint_db)
+    elif resume:
+        committed_keys = existing_lmdb_keys(envs)
+        remaining_paths = [
+            p for p in paths if lmdb_key_extractor_func(p) not in committed_keys
+        ]
+        num_skipped = len(paths) - len(remaining_paths)
+        log.info(f"Resuming: skipping {num_skipped} already encoded patches.")
+        paths = remaining_paths
+        if previous_entry is not None:
+            last_committed_key = previous_entry["last_committed_key"]
+
+    collect_statistics = statistics
+    if statistics and (part is not None or num_skipped > 0):
+        log.warning(
+            f"Skipping the statistics of {journal_name}, as not all patches are encoded in this run."
+        )
+        collect_statistics = False
+    dataset_statistics = {}
+
+    journal_entry = {
+        "status": "incomplete",
+        "num_paths": len(paths) + num_skipped,
+        "num_committed": num_skipped,
+        "last_committed_key": last_committed_key,
+    }
+    write_journal_entry(target_dir, journal_name, journal_entry)
+
+    num_workers = max_workers or os.cpu_count()
+    max_in_flight = max_in_flight or 4 * num_workers
+    dictionary_key = None
+    schema_key = None
+    with ExitStack() as stack:
+        if executor is None:
+            executor = worker_pool(num_workers, gdal_options)
+        if compact and paths:
+            schema = executor.submit(
+                record_schema, safetensor_generator, first_path
+            ).result()
+            schema_key = compact_schema_key(zlib.crc32(schema))
+            for env in envs:
+                with env.begin(write=True) as txn:
+                    txn.put(schema_key, schema)
+            # has to be applied before the dictionary compression
+            encoders.append(partial(compact_record, schema))
+        if zstd_dictionary_samples is not None and paths:
+            log.info(f"Training zstd dictionary from {len(sample_paths)} records")
+            samples = list(executor.map(safetensor_generator, sample_paths))
+            if schema_key is not None:
+                # train on the records that are actually compressed
+                samples = [compact_record(schema, sample) for sample in samples]
+            dictionary = train_zstd_dictionary(samples)
+            dictionary_key = zstd_dictionary_key(dictionary.dict_id())
+            for env in envs:
+                with env.begin(write=True) as txn:
+                    txn.put(dictionary_key, dictionary.as_bytes())
+            # the workers of the shared pool load the dictionary once from shared memory
+            encoders.append(
+                partial(
+                    zstd_dictionary_compress,
+                    stack.enter_context(shared_memory_copy(dictionary.as_bytes())),
+                    ZSTD_DICTIONARY_LEVEL,
+                )
+            )
+        if part is not None:
+            previous_part_entry = (
+                (read_part_manifest(target_dir) or {})
+                .get("datasets", {})
+                .get(journal_name, {})
+            )
+            write_part_entry(
+                target_dir,
+                part,
+                journal_name,
+                {
+                    "keys": part_keys,
+                    # a resumed part without remaining paths does not train the dictionary again
+                    "zstd_dictionary_key": (
+                        dictionary_key.decode()
+                        if dictionary_key is not None
+                        else previous_part_entry.get("zstd_dictionary_key")
+                    ),
+                    "compact_schema_key": (
+                        schema_key.decode()
+                        if schema_key is not None
+                        else previous_part_entry.get("compact_schema_key")
+                    ),
+                },
+            )
+        log.debug("About to serialize data in chunks")
+        pbar = stack.enter_context(tqdm(total=len(paths)))
+        # the shard writers commit concurrently
+        journal_lock = threading.Lock()
+
+        def on_commit(num_records: int, last_key: Optional[bytes]):
+            with journal_lock:
+                pbar.update(num_records)
+                if last_key is not None:
+                    journal_entry["num_committed"] += num_records
+                    journal_entry["last_committed_key"] = last_key.decode()
+                    write_journal_entry(target_dir, journal_name, journal_entry)
+
+        # A slow commit (fsync) should not stall the result collection,
+        # so the write transaction of each shard is owned by a separate thread.
+        # The bounded queues apply back-pressure if a writer cannot keep up.
+        result_queues = [queue.Queue(maxsize=max_in_flight) for _ in envs]
+        failures = []
+        writers = [
+            threading.Thread(
+                target=lmdb_commit_loop,
+                args=(
+                    env,
+                    result_queue,
+                    lmdb_key_extractor_func,
+                    commit_records,
+                    commit_bytes,
+                    failures,
+                    on_commit,
+                    fingerprints,
+                ),
+            )
+            for env, result_queue in zip(envs, result_queues)
+        ]
+        for writer in writers:
+            writer.start()
+        try:
+            # To ensure deterministic output, the results are written in order
+            # i.e., cannot use `as_completed` !
+            # if the loop stops early, closing the results releases the
+            # shared memory of the pending records
+            results = stack.enter_context(
+                closing(
+                    ordered_results(
+                        executor,
+                        partial(
+                            encode_record,
+                            safetensor_generator,
+                            encoders,
+                            shared_memory_min_bytes,
+                            collect_statistics,
+                        ),
+                        paths,
+                        max_in_flight=max_in_flight,
+                        discard=discard_encoded_record,
+                    )
+                )
+            )
+            for path, (value, record_statistics) in results:
+                if failures:
+                    # only release the shared memory
+                    with shared_memory_value(value):
+                        break
+                if record_statistics is not None:
+                    merge_band_statistics(dataset_statistics, record_statistics)
+                shard = (
+                    shard_index(lmdb_key_extractor_func(path), num_shards)
+                    if num_shards > 1
+                    else 0
+                )
+                result_queues[shard].put((path, value))
+        except CompactSchemaError as e:
+            failures.append(
+                f"The header of {lmdb_key_extractor_func(e.args[0]).decode()} differs from "
+                f"the first record of {journal_name}; the records do not share one header, drop `--compact`"
+            )
+        finally:
+            for result_queue, writer in zip(result_queues, writers):
+                result_queue.put(None)
+                writer.join()
+    if failures:
+        sys.exit(failures[0])
+
+    if collect_statistics:
+        value = json.dumps(finalize_band_statistics(dataset_statistics)).encode()
+        for env in envs:
             with env.begin(write=True) as txn:
-                futures_to_path = {
-                    executor.submit(safetensor_generator, path): path
-                    for path in paths_chunk
-                }
-                # To ensure deterministic output, write in order
-                # i.e., cannot use `as_completed(futures_to_path)` !
-                for future in futures_to_path:
-                    p = futures_to_path[future]
-                    if not txn.put(
-                        lmdb_key_extractor_func(p),
-                        future.result(),
-                        overwrite=False,
-                    ):
-                        sys.exit(
-                            f"Program about to overwriting data in the DB: with source {str(p)} Stopping execution!"
-                        )
+                txn.put(statistics_key(sub_dataset_name(journal_name)), value)
+
+    index_keys = sorted(lmdb_key_extractor_func(p) for p in index_paths)
+    write_key_index_entry(
+        target_dir,
+        sub_dataset_name(journal_name),
+        index_keys,
+        record_sizes(envs, index_keys),
+        (
+            executor.submit(record_bands, safetensor_generator, index_paths[0]).result()
+            if index_paths
+            else None
+        ),
+    )
+
+    journal_entry["status"] = "complete"
+    write_journal_entry(target_dir, journal_name, journal_entry)
+
+
+def read_parts(part_dirs: list[Path]) -> list[tuple[Path, dict]]:
+    """
+    Read the part manifests of the `part_dirs` and return the `(part_dir, manifest)`
+    tuples sorted by the part index.
+
+    Exits the program if a part is missing, incomplete, or does not belong
+    to the same conversion as the other parts.
+    """
+    parts = []
+    for part_dir in part_dirs:
+        manifest = read_part_manifest(part_dir)
+        if manifest is None:
+            sys.exit(f"{part_dir} was not created with `--part`")
+        journal = read_journal(part_dir)
+        for name in manifest["datasets"]:
+            if journal.get(name, {}).get("status") != "complete":
+                sys.exit(f"{name} of {part_dir} did not complete; use `--resume` first")
+        parts.append((Path(part_dir), manifest))
+    parts.sort(key=lambda part: part[1]["index"])
+
+    num_parts = parts[0][1]["num_parts"]
+    if [manifest["index"] for _, manifest in parts] != list(range(num_parts)) or any(
+        manifest["num_parts"] != num_parts for _, manifest in parts
+    ):
+        sys.exit(f"Expected the parts 0 to {num_parts - 1} exactly once")
+    names = list(parts[0][1]["datasets"])
+    if any(list(manifest["datasets"]) != names for _, manifest in parts):
+        sys.exit("All parts have to contain the same sub-datasets")
+    return parts
+
+
+def lmdb_merger(
+    envs,
+    part_dirs: list[Path],
+    max_in_flight=64,
+    commit_records=DEFAULT_COMMIT_RECORDS,
+    commit_bytes=DEFAULT_COMMIT_BYTES,
+):
+    """
+    Merge the LMDB databases of a conversion that was split with `--part` (see `read_parts`)
+    into the already opened LMDB shards `envs`.
+
+    For every sub-dataset, the records are inserted in the order of the part index
+    and in the insertion order of each part, which is the sorted order of a single run.
+    The records are committed by the same `lmdb_commit_loop` with the same
+    `commit_records` and `commit_bytes` thresholds as in `lmdb_writer`,
+    so the result is identical to a conversion without `--part`.
+    At most `max_in_flight` records per shard are buffered for the writer threads.
+    The function will NOT overwrite any data!
+    """
+    parts = read_parts(part_dirs)
+    num_shards = len(envs)
+    target_dir = Path(envs[0].path())
+    if num_shards > 1:
+        target_dir = target_dir.parent
+
+    for name in parts[0][1]["datasets"]:
+        entries = [manifest["datasets"][name] for _, manifest in parts]
+        num_keys = sum(len(entry["keys"]) for entry in entries)
+        log.debug(f"Merging {num_keys} records of {name} from {len(parts)} parts")
+        # the compact record schema and the zstd dictionary are stored in every shard,
+        # in the same order as in `lmdb_writer` for byte-identical databases
+        for reserved in ["compact_schema_key", "zstd_dictionary_key"]:
+            reserved_key, part_dir = next(
+                (
+                    (e.get(reserved), d)
+                    for (d, _), e in zip(parts, entries)
+                    if e.get(reserved)
+                ),
+                (None, None),
+            )
+            if reserved_key is None:
+                continue
+            reserved_key = reserved_key.encode()
+            with LMDBReader(part_dir).envs[0].begin(write=False) as txn:
+                reserved_value = txn.get(reserved_key)
+            for env in envs:
+                with env.begin(write=True) as txn:
+                    txn.put(reserved_key, reserved_value)
+
+        journal_entry = {
+            "status": "incomplete",
+            "num_paths": num_keys,
+            "num_committed": 0,
+            "last_committed_key": None,
+        }
+        write_journal_entry(target_dir, name, journal_entry)
+        with tqdm(total=num_keys) as pbar:
+            journal_lock = threading.Lock()
+
+            def on_commit(num_records: int, last_key: Optional[bytes]):
+                with journal_lock:
+                    pbar.update(num_records)
+                    if last_key is not None:
+                        journal_entry["num_committed"] += num_records
+                        journal_entry["last_committed_key"] = last_key.decode()
+
+            result_queues = [queue.Queue(maxsize=max_in_flight) for _ in envs]
+            failures = []
+            writers = [
+                threading.Thread(
+                    target=lmdb_commit_loop,
+                    # the items are already `(key, value)` tuples
+                    args=(
+                        env,
+                        result_queue,
+                        bytes,
+                        commit_records,
+                        commit_bytes,
+                        failures,
+                        on_commit,
+                    ),
+                )
+                for env, result_queue in zip(envs, result_queues)
+            ]
+            for writer in writers:
+                writer.start()
+            try:
+                for (part_dir, _), entry in zip(parts, entries):
+                    part_envs = LMDBReader(part_dir).envs
+                    with ExitStack() as stack:
+                        txns = [
+                            stack.enter_context(env.begin(write=False))
+                            for env in part_envs
+                        ]
+                        for key in map(str.encode, entry["keys"]):
+                            if failures:
+                                break
+                            value = txns[shard_index(key, len(txns))].get(key)
+                            if value is None:
+                                failures.append(f"{part_dir} is missing the key {key}")
+                                break
+                            shard = (
+                                shard_index(key, num_shards) if num_shards > 1 else 0
+                            )
+                            result_queues[shard].put((key, value))
+            finally:
+                for result_queue, writer in zip(result_queues, writers):
+                    result_queue.put(None)
+                    writer.join()
+        if failures:
+            sys.exit(failures[0])
+        keys = sorted(key.encode() for entry in entries for key in entry["keys"])
+        part_datasets = (read_key_index(parts[0][0]) or {}).get("datasets", [])
+        write_key_index_entry(
+            target_dir,
+            sub_dataset_name(name),
+            keys,
+            record_sizes(envs, keys),
+            next(
+                (
+                    d["bands"]
+                    for d in part_datasets
+                    if d["name"] == sub_dataset_name(name)
+                ),
+                None,
+            ),
+        )
+        journal_entry["status"] = "complete"
+        write_journal_entry(target_dir, name, journal_entry)
 
 
 def main():
-    app()
+    try:
+        app()
+    finally:
+        shutdown_worker_pool()
 
 
 if __name__ == "__main__":
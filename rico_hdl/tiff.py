@@ -0,0 +1,137 @@
+"""
+A minimal reader for simple, uncompressed single-band TIFF files.
+
+Most band files of BigEarthNet, SSL4EO-S12, and Major-TOM are small
+single-band GeoTIFFs. For these files, constructing a full GDAL dataset is
+more expensive than decoding the data itself.
+`read_simple_tiff` parses the first image file directory (IFD) directly and
+copies the strips into a single array, which is identical to the array
+returned by `rasterio`.
+Every file that does not have the simple layout is rejected with `None`,
+so that the caller can fall back to `rasterio`.
+
+Only depends on `numpy` and the standard library.
+"""
+
+import struct
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Baseline TIFF tags that are required to locate and interpret the strips
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+BITS_PER_SAMPLE = 258
+COMPRESSION = 259
+STRIP_OFFSETS = 273
+ORIENTATION = 274
+SAMPLES_PER_PIXEL = 277
+ROWS_PER_STRIP = 278
+STRIP_BYTE_COUNTS = 279
+TILE_WIDTH = 322
+SAMPLE_FORMAT = 339
+
+COMPRESSION_NONE = 1
+ORIENTATION_TOP_LEFT = 1
+
+# The tag value types that are used by the baseline tags above
+TIFF_TYPE_FORMATS = {3: "H", 4: "I"}
+
+# Maps `(SampleFormat, BitsPerSample)` to the numpy data type
+SAMPLE_DTYPES = {
+    (1, 8): "u1",
+    (1, 16): "u2",
+    (1, 32): "u4",
+    (1, 64): "u8",
+    (2, 8): "i1",
+    (2, 16): "i2",
+    (2, 32): "i4",
+    (2, 64): "i8",
+    (3, 32): "f4",
+    (3, 64): "f8",
+}
+
+
+def _read_ifd(f, byte_order: str, offset: int) -> Optional[dict[int, tuple]]:
+    """
+    Read the baseline tags of the classic TIFF IFD at `offset`.
+    Tags with value types other than SHORT and LONG are skipped, as they are
+    not required to decode the strips.
+    """
+    f.seek(offset)
+    (num_entries,) = struct.unpack(byte_order + "H", f.read(2))
+    entries = f.read(num_entries * 12)
+    if len(entries) != num_entries * 12:
+        return None
+    tags = {}
+    for tag, value_type, count, value in struct.iter_unpack(
+        byte_order + "HHI4s", entries
+    ):
+        fmt = TIFF_TYPE_FORMATS.get(value_type)
+        if fmt is None:
+            continue
+        size = struct.calcsize(fmt) * count
+        if size > 4:
+            (value_offset,) = struct.unpack(byte_order + "I", value)
+            f.seek(value_offset)
+            value = f.read(size)
+        tags[tag] = struct.unpack(f"{byte_order}{count}{fmt}", value[:size])
+    return tags
+
+
+def read_simple_tiff(path: Path) -> Optional[np.ndarray]:
+    """
+    Read the first band of the TIFF file at `path` into a `(H, W)` array
+    in native byte order, if the file is a classic (non-Big) TIFF with a
+    single, uncompressed, strip-organized sample per pixel.
+    Returns `None` for every other layout.
+    """
+    with open(path, "rb") as f:
+        header = f.read(8)
+        if header[:4] == b"II*\x00":
+            byte_order = "<"
+        elif header[:4] == b"MM\x00*":
+            byte_order = ">"
+        else:
+            return None
+        (ifd_offset,) = struct.unpack(byte_order + "I", header[4:8])
+        try:
+            tags = _read_ifd(f, byte_order, ifd_offset)
+        except struct.error:
+            return None
+        if tags is None or TILE_WIDTH in tags:
+            return None
+        if tags.get(COMPRESSION, (COMPRESSION_NONE,)) != (COMPRESSION_NONE,):
+            return None
+        if tags.get(SAMPLES_PER_PIXEL, (1,)) != (1,):
+            return None
+        if tags.get(ORIENTATION, (ORIENTATION_TOP_LEFT,)) != (ORIENTATION_TOP_LEFT,):
+            return None
+        try:
+            (width,) = tags[IMAGE_WIDTH]
+            (height,) = tags[IMAGE_LENGTH]
+            (bits_per_sample,) = tags.get(BITS_PER_SAMPLE, (1,))
+            (sample_format,) = tags.get(SAMPLE_FORMAT, (1,))
+            offsets = tags[STRIP_OFFSETS]
+            byte_counts = tags[STRIP_BYTE_COUNTS]
+        except (KeyError, ValueError):
+            return None
+        dtype = SAMPLE_DTYPES.get((sample_format, bits_per_sample))
+        if dtype is None or len(offsets) != len(byte_counts):
+            return None
+        dtype = np.dtype(byte_order + dtype)
+        buffer = bytearray(width * height * dtype.itemsize)
+        view = memoryview(buffer)
+        position = 0
+        for offset, byte_count in zip(offsets, byte_counts):
+            # the last strip may be padded
+            byte_count = min(byte_count, len(buffer) - position)
+            f.seek(offset)
+            if f.readinto(view[position : position + byte_count]) != byte_count:
+                return None
+            position += byte_count
+        if position != len(buffer):
+            return None
+    data = np.frombuffer(buffer, dtype=dtype).reshape(height, width)
+    return data.astype(dtype.newbyteorder("="), copy=False)